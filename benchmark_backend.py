@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark container scale-up latency and routing throughput without Docker.
+
+Runs the routing server in this process with the process backend, which
+starts main-server/server.py instances as local subprocesses instead of
+containers. First times how long bringing a new instance into service
+takes, alone and in a burst provisioned concurrently, then serves the
+router on a local port and drives /work through it like
+benchmark_routing.py does. Needs main-server's requirements
+(flask, numpy) installed next to the router's:
+
+    python benchmark_backend.py --mode threaded
+    python benchmark_backend.py --mode async --requests 500 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import wait
+
+os.environ['CONTAINER_BACKEND'] = 'process'
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing-server'))
+
+from benchmark_routing import percentile, run_target  # noqa: E402
+
+
+def serve_threaded(port):
+    """Serve the threaded router in a background thread and return its container manager"""
+    from werkzeug.serving import make_server
+    import routing_server
+
+    server = make_server('127.0.0.1', port, routing_server.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return routing_server.container_manager
+
+
+def serve_async(port):
+    """Serve the async router on its own event loop thread and return its container manager"""
+    from aiohttp import web
+    import async_routing_server
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(async_routing_server.create_app())
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    return async_routing_server.container_manager
+
+
+def wait_for_server(url, timeout=10):
+    import requests
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    raise Exception(f"Routing server at {url} did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['threaded', 'async'], default='threaded', help='routing server to run')
+    parser.add_argument('--port', type=int, default=8100, help='local port for the routing server')
+    parser.add_argument('--scale-ups', type=int, default=3, help='cold scale-ups to time')
+    parser.add_argument('--burst', type=int, default=10, help='instances to provision concurrently')
+    parser.add_argument('--requests', type=int, default=200, help='/work requests to send')
+    parser.add_argument('--concurrency', type=int, default=50, help='maximum requests in flight')
+    parser.add_argument('--intensity', type=int, default=1, help='job intensity sent to /work')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("PROCESS BACKEND BENCHMARK")
+    print("=" * 50)
+    print()
+
+    serve = serve_threaded if args.mode == 'threaded' else serve_async
+    manager = serve(args.port)
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for_server(url)
+
+        if args.scale_ups:
+            scale_up_times = []
+            for _ in range(args.scale_ups):
+                start = time.perf_counter()
+                manager.create_new_container()
+                scale_up_times.append(time.perf_counter() - start)
+            print(f"Cold scale-up ({args.scale_ups} instances)")
+            print(f"  Latency:    mean {sum(scale_up_times) / len(scale_up_times):.2f}s  "
+                  f"p50 {percentile(scale_up_times, 50):.2f}s  max {max(scale_up_times):.2f}s")
+            print()
+
+        if args.burst:
+            start = time.perf_counter()
+            done, _ = wait(manager.provisioner.provision(args.burst))
+            elapsed = time.perf_counter() - start
+            failed = sum(1 for future in done if future.exception() is not None)
+            print(f"Burst scale-up ({args.burst} instances concurrently, {failed} failed)")
+            print(f"  Elapsed:    {elapsed:.2f}s")
+            print()
+
+        asyncio.run(run_target(args.mode, url, args.requests, args.concurrency, args.intensity))
+        print(f"Containers at the end: {len(manager.containers)}")
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
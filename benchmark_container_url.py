@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of container URL resolution on the /work hot path.
+
+Compares resolving a container's address through the Docker API on every
+request (two API round-trips: get + reload) with the in-memory endpoint
+registry lookup done by ContainerManager.get_container_url.
+
+Needs a running Docker daemon and the main-server:latest image.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing-server'))
+
+from container_manager import ContainerManager  # noqa: E402
+
+ITERATIONS = 200
+
+
+def resolve_through_docker(manager, container_id):
+    """Per-request resolution, as /work did before the endpoint registry"""
+    container = manager.backend.client.containers.get(container_id)
+    container.reload()
+    return manager.backend._url_from_attrs(container.attrs)
+
+
+def time_per_call(func, *args, iterations=ITERATIONS):
+    """Return the mean seconds per call of func(*args)"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(*args)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    print("=" * 50)
+    print("CONTAINER URL RESOLUTION BENCHMARK")
+    print("=" * 50)
+    print()
+
+    manager = ContainerManager()
+    try:
+        container_id = manager.create_new_container()
+        print(f"Using container {container_id[:12]}...")
+
+        before = time_per_call(resolve_through_docker, manager, container_id)
+        after = time_per_call(manager.get_container_url, container_id, iterations=ITERATIONS * 1000)
+
+        print(f"  Docker API per request: {before * 1e6:10.1f} us/call")
+        print(f"  Endpoint registry:      {after * 1e6:10.3f} us/call")
+        print(f"  Speedup:                {before / after:10.0f}x")
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark main-server /light matrix multiplies with fresh and arena buffers.
+
+Imports main-server/server.py and runs its /light work in-process, once
+allocating new matrices per call and once reusing the buffer arena, from
+several threads the way werkzeug serves concurrent requests. Reports time
+per call, minor page faults per call and the peak memory NumPy allocated:
+
+    python benchmark_light.py
+    python benchmark_light.py --intensities 1 5 10 --calls 100 --threads 4
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main-server'))
+
+import server  # noqa: E402
+
+
+def run_calls(intensity, calls, threads):
+    """Run calls /light multiplies on threads and return ms per call, page faults per call and peak MB"""
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(server.light_matmul, [intensity] * calls))
+    elapsed = time.perf_counter() - start
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults
+    _, peak = tracemalloc.get_traced_memory()
+    return elapsed / calls * 1000, faults / calls, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--intensities', nargs='+', type=int, default=[1, 5, 10], help='intensities to run')
+    parser.add_argument('--calls', type=int, default=100, help='calls per intensity')
+    parser.add_argument('--threads', type=int, default=4, help='threads making calls at the same time')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("LIGHT WORK BUFFER BENCHMARK")
+    print("=" * 50)
+    print(f"{args.calls} calls per intensity on {args.threads} threads")
+    print()
+    print(f"{'buffers':<10}{'intensity':>10}{'ms/call':>10}{'faults':>10}{'peak MB':>10}")
+
+    tracemalloc.start()
+    arena = server.BufferArena(server.LIGHT_ARENA_BYTES)
+    for mode, arena_used in (('fresh', None), ('arena', arena)):
+        server.light_arena = arena_used
+        for intensity in args.intensities:
+            # Warm up so the arena's first allocations are not counted
+            run_calls(intensity, args.threads, args.threads)
+            ms, faults, peak = run_calls(intensity, args.calls, args.threads)
+            print(f"{mode:<10}{intensity:>10}{ms:>10.2f}{faults:>10.0f}{peak:>10.1f}")
+
+    print()
+    print(f"Arena: {arena.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
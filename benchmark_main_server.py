@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark main-server /heavy throughput in jobs per second.
+
+Starts main-server/server.py as a local process once per configuration and
+sends concurrent /heavy jobs at several intensities:
+
+    inline   one process, factorials run in the request threads
+    pool     half the CPUs serve requests and the rest run their factorials,
+             the split main-server makes by default under a CPU quota
+    prefork  one pre-forked worker process per CPU, factorials inline
+    cached   one process, factorials answered from the factorial cache
+
+All but cached run with the factorial cache off, so they measure the
+factorials themselves.
+
+Needs main-server's requirements (flask, numpy) installed:
+
+    python benchmark_main_server.py
+    python benchmark_main_server.py --configs inline pool --intensities 1 2 4 --jobs 40 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+import requests
+
+from benchmark_routing import percentile
+
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main-server', 'server.py')
+
+CPUS = len(os.sched_getaffinity(0))
+# main-server's default split of a quota of CPUS: the workers, and the CPUs they leave over shared between their pools
+SPLIT_WORKERS = math.ceil(CPUS / 2)
+SPLIT_CPU_WORKERS = max(1, math.ceil((CPUS - SPLIT_WORKERS) / SPLIT_WORKERS))
+
+CONFIGS = {
+    'inline': {'WORKERS': '1', 'CPU_WORKERS': '0', 'FACTORIAL_CACHE_BYTES': '0'},
+    'pool': {'WORKERS': str(SPLIT_WORKERS), 'CPU_WORKERS': str(SPLIT_CPU_WORKERS), 'FACTORIAL_CACHE_BYTES': '0'},
+    'prefork': {'WORKERS': str(CPUS), 'CPU_WORKERS': '0', 'FACTORIAL_CACHE_BYTES': '0'},
+    'cached': {'WORKERS': '1', 'CPU_WORKERS': '0'},
+}
+
+
+def start_server(port, config):
+    """Start main-server with a configuration's environment and wait until it is ready"""
+    environment = dict(os.environ, PORT=str(port), **CONFIGS[config])
+    process = subprocess.Popen([sys.executable, SERVER_PATH], cwd=os.path.dirname(SERVER_PATH), env=environment,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                return process
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise Exception(f"main-server ({config}) did not come up on port {port}")
+
+
+async def run_jobs(url, jobs, concurrency, intensity):
+    """Send jobs /heavy requests with at most concurrency in flight and return jobs/s, p50 and errors"""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=300)) as session:
+        async def send_job():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.post(f"{url}/heavy", json={'intensity': intensity}) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                            return
+                except aiohttp.ClientError:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send_job() for _ in range(jobs)))
+        elapsed = time.perf_counter() - start
+
+    return len(latencies) / elapsed, percentile(latencies, 50), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', nargs='+', choices=list(CONFIGS), default=list(CONFIGS),
+                        help='server configurations to compare')
+    parser.add_argument('--intensities', nargs='+', type=int, default=[1, 3, 5], help='job intensities to send')
+    parser.add_argument('--jobs', type=int, default=40, help='jobs per intensity')
+    parser.add_argument('--concurrency', type=int, default=20, help='maximum jobs in flight')
+    parser.add_argument('--port', type=int, default=5900, help='local port for main-server')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("MAIN SERVER THROUGHPUT BENCHMARK")
+    print("=" * 50)
+    print(f"{CPUS} CPUs, {args.jobs} jobs per intensity, {args.concurrency} in flight")
+    print()
+    print(f"{'config':<10}{'intensity':>10}{'jobs/s':>10}{'p50':>10}{'errors':>8}")
+
+    for config in args.configs:
+        process = start_server(args.port, config)
+        try:
+            for intensity in args.intensities:
+                rate, p50, errors = asyncio.run(
+                    run_jobs(f"http://127.0.0.1:{args.port}", args.jobs, args.concurrency, intensity))
+                print(f"{config:<10}{intensity:>10}{rate:>10.2f}{p50:>9.2f}s{errors:>8}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
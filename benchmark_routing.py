@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark the threaded and async routing server /work paths.
+
+Start the routing server in one mode, run this script against it, then repeat
+with the other mode:
+
+    ROUTING_MODE=threaded docker-compose up -d
+    python benchmark_routing.py threaded=http://localhost:8000
+
+    ROUTING_MODE=async docker-compose up -d
+    python benchmark_routing.py async=http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_target(label, url, total_requests, concurrency, intensity):
+    """Send total_requests /work requests with at most concurrency in flight"""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=300)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def send_request():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.post(f"{url}/work", json={'intensity': intensity}) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                            return
+                except aiohttp.ClientError:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send_request() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{label} ({url})")
+    print(f"  Requests:   {total_requests} ({errors} failed)")
+    print(f"  Elapsed:    {elapsed:.2f}s")
+    print(f"  Throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"  Latency:    p50 {percentile(latencies, 50):.3f}s  "
+          f"p95 {percentile(latencies, 95):.3f}s  p99 {percentile(latencies, 99):.3f}s")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('targets', nargs='*', default=['threaded=http://localhost:8000'],
+                        help='label=url pairs of routing servers to benchmark')
+    parser.add_argument('--requests', type=int, default=500, help='requests per target')
+    parser.add_argument('--concurrency', type=int, default=200, help='maximum requests in flight')
+    parser.add_argument('--intensity', type=int, default=1, help='job intensity sent to /work')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("ROUTING SERVER BENCHMARK")
+    print("=" * 50)
+    print()
+
+    for target in args.targets:
+        label, _, url = target.partition('=')
+        asyncio.run(run_target(label, url or label, args.requests, args.concurrency, args.intensity))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import React, { useState, useEffect, useCallback, useRef } from 'react';
 import axios from 'axios';
 
 const ROUTING_SERVER = 'http://localhost:8000';
+const ROUTER_NODE_ID = 'router';
 
 const styles = {
   container: {
@@ -140,12 +141,13 @@ function App() {
   const [edges, setEdges] = useState([]);
   const [stats, setStats] = useState({ total_containers: 0, total_load: 0 });
   const svgRef = useRef(null);
+  const nodeMapRef = useRef(new Map());
 
   const fetchGraphData = useCallback(async () => {
     try {
       const response = await axios.get(`${ROUTING_SERVER}/graph`);
       const { nodes: backendNodes, edges: backendEdges, total_containers, total_load } = response.data;
-      setNodes(backendNodes);
+      setNodes(backendNodes.filter(node => node.type !== 'router'));
       setEdges(backendEdges);
       setStats({ total_containers, total_load });
     } catch (error) {
@@ -153,6 +155,20 @@ function App() {
     }
   }, []);
 
+  // Apply a snapshot or delta pushed by the routing server's /events stream
+  const applyEvent = useCallback((type, data) => {
+    const nodeMap = type === 'snapshot' ? new Map() : nodeMapRef.current;
+    (type === 'snapshot' ? data.nodes : [...data.added, ...data.updated]).forEach(node => nodeMap.set(node.id, node));
+    (data.removed || []).forEach(id => nodeMap.delete(id));
+    nodeMapRef.current = nodeMap;
+
+    const currentNodes = Array.from(nodeMap.values());
+    setNodes(currentNodes);
+    // Every container hangs off the router, weighted by its request rate
+    setEdges(currentNodes.map(node => ({ source: ROUTER_NODE_ID, target: node.id, weight: node.request_rate })));
+    setStats({ total_containers: data.total_containers, total_load: data.total_load });
+  }, []);
+
   const renderNetwork = useCallback(() => {
     const svg = svgRef.current;
     if (!svg || !nodes.length) return;
@@ -179,6 +195,7 @@ function App() {
       };
     });
     const positionMap = new Map(nodePositions.map(pos => [pos.id, pos]));
+    positionMap.set(ROUTER_NODE_ID, { x: centerX, y: centerY, id: ROUTER_NODE_ID });
 
     // Draw edges first (so they are behind nodes)
     edges.forEach(edge => {
@@ -192,7 +209,8 @@ function App() {
         line.setAttribute('x2', targetPos.x);
         line.setAttribute('y2', targetPos.y);
         line.setAttribute('stroke', 'rgba(0, 234, 255, 0.4)');
-        line.setAttribute('stroke-width', '2');
+        // Thicker edges carry more requests per second
+        line.setAttribute('stroke-width', 1 + Math.min(edge.weight || 0, 10));
         line.classList.add('edge');
         g.appendChild(line);
       }
@@ -229,6 +247,25 @@ function App() {
 
       g.appendChild(nodeGroup);
     });
+
+    // The router sits in the middle of its containers
+    const router = document.createElementNS("http://www.w3.org/2000/svg", "circle");
+    router.setAttribute('cx', centerX);
+    router.setAttribute('cy', centerY);
+    router.setAttribute('r', 40);
+    router.setAttribute('fill', '#1e3a8a');
+    router.setAttribute('stroke', '#00eaff');
+    router.setAttribute('stroke-width', '3');
+    g.appendChild(router);
+    const routerLabel = document.createElementNS("http://www.w3.org/2000/svg", "text");
+    routerLabel.setAttribute('x', centerX);
+    routerLabel.setAttribute('y', centerY + 5);
+    routerLabel.setAttribute('text-anchor', 'middle');
+    routerLabel.textContent = 'Router';
+    routerLabel.style.fill = 'white';
+    routerLabel.style.fontSize = '12px';
+    routerLabel.style.fontWeight = 'bold';
+    g.appendChild(routerLabel);
   }, [nodes, edges]);
 
   useEffect(() => {
@@ -243,10 +280,20 @@ function App() {
   }, []);
 
   useEffect(() => {
-    fetchGraphData();
-    const interval = setInterval(fetchGraphData, 1000); // 1-second refresh
-    return () => clearInterval(interval);
-  }, [fetchGraphData]);
+    if (!window.EventSource) {
+      // No Server-Sent Events support, fall back to polling
+      fetchGraphData();
+      const interval = setInterval(fetchGraphData, 1000); // 1-second refresh
+      return () => clearInterval(interval);
+    }
+    // The browser reconnects on its own and the server starts each connection with a snapshot
+    const source = new EventSource(`${ROUTING_SERVER}/events`);
+    const onMessage = (event) => applyEvent(event.type, JSON.parse(event.data));
+    source.addEventListener('snapshot', onMessage);
+    source.addEventListener('delta', onMessage);
+    source.onerror = () => console.error('Event stream disconnected, reconnecting...');
+    return () => source.close();
+  }, [fetchGraphData, applyEvent]);
 
   useEffect(() => {
     renderNetwork();
@@ -5,6 +5,8 @@ class ContainerDashboard {
         this.nodes = new vis.DataSet();
         this.edges = new vis.DataSet();
         this.refreshInterval = null;
+        this.eventSource = null;
+        this.streamNodes = new Map();
         this.isConnected = false;
         
         this.init();
@@ -190,33 +192,19 @@ class ContainerDashboard {
         // Create nodes from containers
         Object.entries(statusData.containers).forEach(([containerId, info]) => {
             this.addLog(`Creating node for container: ${info.name}`, 'info');
-            const node = {
-                id: containerId,
-                label: info.name,
-                color: {
-                    background: this.getContainerColor(info.load),
-                    border: this.getContainerBorderColor(info.load),
-                    highlight: {
-                        background: this.getContainerColor(info.load, true),
-                        border: this.getContainerBorderColor(info.load, true)
-                    }
-                },
-                title: `Container: ${info.name}\nLoad: ${info.load}\nPort: ${info.port}\nCreated: ${info.created_at}`
-            };
-            nodes.push(node);
+            nodes.push(this.buildNode(containerId, info));
         });
 
-        // Create edges between containers (simplified)
-        const containerIds = Object.keys(statusData.containers);
-        for (let i = 0; i < containerIds.length; i++) {
-            for (let j = i + 1; j < containerIds.length; j++) {
-                edges.push({
-                    from: containerIds[i],
-                    to: containerIds[j],
-                    color: { color: '#95a5a6' }
-                });
-            }
-        }
+        // Every container hangs off the router, weighted by its request rate
+        nodes.push({
+            id: 'router',
+            label: 'Routing Server',
+            shape: 'box',
+            color: { background: '#2c3e50', border: '#3498db' }
+        });
+        Object.entries(statusData.containers).forEach(([containerId, info]) => {
+            edges.push(this.buildEdge(containerId, info));
+        });
 
         this.addLog(`Graph update: ${nodes.length} nodes, ${edges.length} edges`, 'info');
 
@@ -232,6 +220,72 @@ class ContainerDashboard {
         }
     }
 
+    buildNode(containerId, info) {
+        return {
+            id: containerId,
+            label: info.name,
+            color: {
+                background: this.getContainerColor(info.load),
+                border: this.getContainerBorderColor(info.load),
+                highlight: {
+                    background: this.getContainerColor(info.load, true),
+                    border: this.getContainerBorderColor(info.load, true)
+                }
+            },
+            title: `Container: ${info.name}\nLoad: ${info.load}\nPort: ${info.port}\nCreated: ${info.created_at}`
+        };
+    }
+
+    buildEdge(containerId, info) {
+        const rate = info.request_rate || 0;
+        return {
+            id: containerId,
+            from: 'router',
+            to: containerId,
+            width: 1 + Math.min(rate, 10),
+            title: `${rate} req/s`,
+            color: { color: '#95a5a6' }
+        };
+    }
+
+    startStream() {
+        // Snapshots and deltas pushed by the routing server replace polling /status
+        this.eventSource = new EventSource('http://localhost:8000/events');
+        const onMessage = (event) => this.applyEvent(event.type, JSON.parse(event.data));
+        this.eventSource.addEventListener('snapshot', onMessage);
+        this.eventSource.addEventListener('delta', onMessage);
+        this.eventSource.onopen = () => {
+            this.setConnectionStatus(true);
+            this.addLog('Event stream connected', 'success');
+        };
+        this.eventSource.onerror = () => {
+            // EventSource reconnects by itself and the server resends a snapshot
+            this.setConnectionStatus(false);
+            this.addLog('Event stream disconnected, reconnecting...', 'error');
+        };
+    }
+
+    applyEvent(type, data) {
+        if (type === 'snapshot') {
+            this.streamNodes = new Map(data.nodes.map(node => [node.id, node]));
+        } else {
+            [...data.added, ...data.updated].forEach(node => this.streamNodes.set(node.id, node));
+            data.removed.forEach(containerId => this.streamNodes.delete(containerId));
+        }
+
+        document.getElementById('totalContainers').textContent = data.total_containers;
+        document.getElementById('totalLoad').textContent = data.total_load;
+        document.getElementById('lastUpdate').textContent = new Date().toLocaleTimeString();
+
+        if (type === 'snapshot' || data.added.length || data.removed.length) {
+            this.updateGraph({ containers: Object.fromEntries(this.streamNodes) });
+        } else {
+            // Only loads and rates changed, update those nodes and edges in place
+            this.nodes.update(data.updated.map(node => this.buildNode(node.id, node)));
+            this.edges.update(data.updated.map(node => this.buildEdge(node.id, node)));
+        }
+    }
+
     getContainerColor(load, highlight = false) {
         if (load === 0) {
             return highlight ? '#2ecc71' : '#27ae60'; // Green
@@ -371,6 +425,14 @@ class ContainerDashboard {
     }
 
     startAutoRefresh() {
+        if (window.EventSource) {
+            if (!this.eventSource) {
+                this.startStream();
+                this.addLog('Live updates started', 'info');
+            }
+            return;
+        }
+
         if (this.refreshInterval) {
             clearInterval(this.refreshInterval);
         }
@@ -384,6 +446,11 @@ class ContainerDashboard {
     }
 
     stopAutoRefresh() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+            this.addLog('Live updates stopped', 'info');
+        }
         if (this.refreshInterval) {
             clearInterval(this.refreshInterval);
             this.refreshInterval = null;
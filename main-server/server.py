@@ -1,30 +1,374 @@
-from flask import Flask, request, jsonify
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from flask import Flask, Response, request, jsonify
+from waitress import serve
 import time
+import itertools
+import json
 import numpy as np
 import math
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
 
 app = Flask(__name__)
 
 
+def cpu_quota():
+    """Number of CPUs this container may use from its cgroup CPU quota, or 0 if it has none"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = open('/sys/fs/cgroup/cpu.max').read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: a quota of -1 means unlimited
+        quota = int(open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us').read())
+        period = int(open('/sys/fs/cgroup/cpu/cpu.cfs_period_us').read())
+        if quota > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+CPU_QUOTA = cpu_quota()
+# Pre-forked worker processes; 0 means half the CPUs of the container's quota, rounded up, leaving the rest to
+# their CPU pools. 1 without a quota, since the CPUs it could run on are shared with every other container
+WORKERS = int(os.environ.get('WORKERS', '0')) or max(1, math.ceil(CPU_QUOTA / 2))
+# Processes each worker runs the CPU-bound part of /heavy on; 0 runs it in the request thread.
+# Defaults to the quota's CPUs left over by the workers, shared out between them
+CPU_WORKERS = int(os.environ.get('CPU_WORKERS', str(math.ceil((CPU_QUOTA - WORKERS) / WORKERS) if CPU_QUOTA > WORKERS else 0)))
+# Request threads of each worker; waitress keeps connections alive, unlike werkzeug's server, so the router's pools reuse them
+THREADS = int(os.environ.get('THREADS', '32'))
+# Memory the factorial cache of each worker may hold; 0 disables it
+FACTORIAL_CACHE_BYTES = int(os.environ.get('FACTORIAL_CACHE_BYTES', str(16 * 1024 * 1024)))
+# Comma-separated intensities whose factorials are computed at startup, e.g. "1,2,3,4,5"
+FACTORIAL_PRECOMPUTE = [int(i) for i in os.environ.get('FACTORIAL_PRECOMPUTE', '').split(',') if i.strip()]
+# Memory of idle /light buffers each worker keeps for reuse; 0 allocates fresh ones per request
+LIGHT_ARENA_BYTES = int(os.environ.get('LIGHT_ARENA_BYTES', str(128 * 1024 * 1024)))
+# Threads each worker runs the jobs of /batch requests on; jobs mostly sleep, so enough that they rarely wait for one
+BATCH_THREADS = int(os.environ.get('BATCH_THREADS', '128'))
+# Most jobs accepted in one /batch request
+BATCH_MAX_JOBS = int(os.environ.get('BATCH_MAX_JOBS', '100'))
+
+cpu_pool = None
+# Created before workers fork, but its threads only start with the first batch
+batch_pool = ThreadPoolExecutor(BATCH_THREADS)
+
+
+def heavy_factorial(intensity):
+    return math.factorial(10000 + intensity * 100)
+
+
+def heavy_cpu(intensity):
+    for _ in range(intensity):
+        _ = heavy_factorial(intensity)
+
+
+class FactorialCache:
+    """Factorials of /heavy by intensity, evicting the least recently used past a memory budget
+
+    The result only depends on the intensity, so a cached one replaces all
+    of a request's factorials. Sizes are measured with sys.getsizeof, which
+    for an int is its whole footprint.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, intensity):
+        """Get the factorial of an intensity and whether it was cached, computing it on a miss"""
+        with self.lock:
+            value = self.entries.get(intensity)
+            if value is not None:
+                self.entries.move_to_end(intensity)
+                self.hits += 1
+                return value, True
+            self.misses += 1
+        # Computed outside the lock, so a miss does not hold up hits on other intensities
+        if cpu_pool is None:
+            value = heavy_factorial(intensity)
+        else:
+            value = cpu_pool.submit(heavy_factorial, intensity).result()
+        self.put(intensity, value)
+        return value, False
+
+    def put(self, intensity, value):
+        """Cache a factorial, evicting the least recently used until it fits"""
+        size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if intensity in self.entries:
+                return
+            self.entries[intensity] = value
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= sys.getsizeof(evicted)
+                self.evictions += 1
+
+    def precompute(self, intensities):
+        """Compute and cache the factorials of intensities up front"""
+        for intensity in intensities:
+            self.put(intensity, heavy_factorial(intensity))
+
+    def get_stats(self):
+        """Get the cache's size and how often it answered"""
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+factorial_cache = FactorialCache(FACTORIAL_CACHE_BYTES) if FACTORIAL_CACHE_BYTES > 0 else None
+
+
+class BufferArena:
+    """Preallocated /light matrices by shape, reused across requests
+
+    A request checks out a set of two operands, a result and the random
+    generator that fills them, and gives it back when done, so concurrent
+    requests never share buffers. Idle sets are kept up to max_bytes; to
+    make room for a set given back, the least recently given back ones are
+    evicted, whatever their shape.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        # Idle sets by token, least recently given back first, and each shape's tokens in the same order
+        self.idle = OrderedDict()
+        self.free = {}
+        self.tokens = itertools.count()
+        self.bytes = 0
+        self.allocated = 0
+        self.reused = 0
+        self.evictions = 0
+        self.seeds = np.random.SeedSequence()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def buffers(self, shape):
+        """Check out an (a, b, out, rng) set for matrices of a shape"""
+        with self.lock:
+            tokens = self.free.get(shape)
+            if tokens:
+                _, buffers = self.idle.pop(tokens.pop())
+                self.bytes -= 3 * buffers[0].nbytes
+                self.reused += 1
+            else:
+                buffers = None
+                seed = self.seeds.spawn(1)[0]
+                self.allocated += 1
+        if buffers is None:
+            buffers = (np.empty(shape), np.empty(shape), np.empty(shape), np.random.default_rng(seed))
+        try:
+            yield buffers
+        finally:
+            size = 3 * buffers[0].nbytes
+            if size <= self.max_bytes:
+                with self.lock:
+                    while self.bytes + size > self.max_bytes:
+                        token, (evicted_shape, evicted) = self.idle.popitem(last=False)
+                        # The least recently given back set of its shape is first in that shape's list
+                        self.free[evicted_shape].remove(token)
+                        self.bytes -= 3 * evicted[0].nbytes
+                        self.evictions += 1
+                    token = next(self.tokens)
+                    self.idle[token] = (shape, buffers)
+                    self.free.setdefault(shape, []).append(token)
+                    self.bytes += size
+
+    def get_stats(self):
+        """Get the idle buffers kept and how many sets were allocated, reused and evicted"""
+        with self.lock:
+            return {
+                "shapes": sorted(f"{shape[0]}x{shape[1]}" for shape, tokens in self.free.items() if tokens),
+                "idle_sets": len(self.idle),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "allocated": self.allocated,
+                "reused": self.reused,
+                "evictions": self.evictions,
+            }
+
+
+light_arena = BufferArena(LIGHT_ARENA_BYTES) if LIGHT_ARENA_BYTES > 0 else None
+
+
+def light_matmul(intensity):
+    size = 100 * intensity
+    if light_arena is None:
+        _ = np.dot(np.random.rand(size, size), np.random.rand(size, size))
+        return
+    with light_arena.buffers((size, size)) as (a, b, out, rng):
+        rng.random(out=a)
+        rng.random(out=b)
+        np.dot(a, b, out=out)
+
+
+def start_cpu_pool():
+    """Start this worker's CPU pool, so factorials run outside the GIL its request threads share"""
+    global cpu_pool
+    if CPU_WORKERS > 0:
+        # Spawned rather than forked, forking a process that runs threads can deadlock
+        cpu_pool = ProcessPoolExecutor(CPU_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        # Start the pool's processes now instead of on the first request
+        list(cpu_pool.map(heavy_cpu, [0] * CPU_WORKERS))
+
+
+def stop_cpu_pool():
+    if cpu_pool is not None:
+        cpu_pool.shutdown(cancel_futures=True)
+
+
+def terminate(signum, frame):
+    # Unwind out of the server loop so the CPU pool is shut down instead of orphaned
+    sys.exit(0)
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # The routing server sizes how much work it sends here by the number of workers
+    return jsonify({"status": "ready", "workers": WORKERS})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    # Each worker process has its own cache and arena, so these are the answering one's
+    cache = factorial_cache.get_stats() if factorial_cache is not None else None
+    arena = light_arena.get_stats() if light_arena is not None else None
+    return jsonify({"pid": os.getpid(), "factorial_cache": cache, "light_arena": arena})
+
+def light_job(intensity):
+    start = time.time()
+    light_matmul(intensity)
+    time_taken = time.time() - start
+    return {"time_taken": time_taken, "message": f"Light work done with intensity {intensity}"}
+
+def heavy_job(intensity):
+    start = time.time()
+    cached = False
+    if factorial_cache is not None:
+        _, cached = factorial_cache.get(intensity)
+    elif cpu_pool is None:
+        heavy_cpu(intensity)
+    else:
+        cpu_pool.submit(heavy_cpu, intensity).result()
+    # Waiting holds only this job's thread, other requests and jobs keep being served
+    time.sleep(intensity * 0.5)
+    time_taken = time.time() - start
+    return {"time_taken": time_taken, "cached": cached, "message": f"Heavy work done with intensity {intensity}"}
+
+JOB_KINDS = {'heavy': heavy_job, 'light': light_job}
+
 @app.route('/light', methods=['POST'])
 def work_light():
     data = request.json or {}
-    intensity = data.get('intensity', 1)
-    start = time.time()
-    _ = np.dot(np.random.rand(100 * intensity, 100 * intensity), np.random.rand(100 * intensity, 100 * intensity))
-    time_taken = time.time() - start
-    return jsonify({"time_taken": time_taken, "message": f"Light work done with intensity {intensity}"})
+    return jsonify(light_job(data.get('intensity', 1)))
 
 @app.route('/heavy', methods=['POST'])
 def work_heavy():
     data = request.json or {}
-    intensity = data.get('intensity', 1)
-    start = time.time()
-    for _ in range(intensity):
-        _ = math.factorial(10000 + intensity * 100)
-    time.sleep(intensity * 0.5)
-    time_taken = time.time() - start
-    return jsonify({"time_taken": time_taken, "message": f"Heavy work done with intensity {intensity}"})
+    return jsonify(heavy_job(data.get('intensity', 1)))
+
+@app.route('/batch', methods=['POST'])
+def work_batch():
+    data = request.json or {}
+    jobs = data.get('jobs')
+    if not isinstance(jobs, list) or not jobs:
+        return jsonify({"error": "jobs must be a non-empty list"}), 400
+    if len(jobs) > BATCH_MAX_JOBS:
+        return jsonify({"error": f"At most {BATCH_MAX_JOBS} jobs per batch"}), 400
+    if not all(isinstance(job, dict) and job.get('kind', 'heavy') in JOB_KINDS for job in jobs):
+        return jsonify({"error": f"Each job needs a kind of {', '.join(JOB_KINDS)}"}), 400
+
+    futures = {batch_pool.submit(JOB_KINDS[job.get('kind', 'heavy')], job.get('intensity', 1)): index
+               for index, job in enumerate(jobs)}
+
+    def stream():
+        # One JSON line per job as soon as it is done, tagged with its position in the batch
+        for future in as_completed(futures):
+            try:
+                result = {"index": futures[future], **future.result()}
+            except Exception as e:
+                result = {"index": futures[future], "error": str(e)}
+            yield json.dumps(result) + "\n"
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
+def serve_prefork(port, workers):
+    """Serve from worker processes forked after binding, so they all accept on one socket"""
+    listener = socket.create_server(('0.0.0.0', port), backlog=128)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, terminate)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            start_cpu_pool()
+            try:
+                serve(app, sockets=[listener], threads=THREADS)
+            finally:
+                stop_cpu_pool()
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"Serving on port {port} with {workers} worker processes", flush=True)
+
+    # Replace workers that die until told to stop
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            spawn()
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    port = int(os.environ.get('PORT', '5000'))
+    if factorial_cache is not None:
+        # Before forking, so every worker starts with these results
+        factorial_cache.precompute(FACTORIAL_PRECOMPUTE)
+    if WORKERS > 1:
+        serve_prefork(port, WORKERS)
+    else:
+        signal.signal(signal.SIGTERM, terminate)
+        start_cpu_pool()
+        try:
+            serve(app, host='0.0.0.0', port=port, threads=THREADS)
+        finally:
+            stop_cpu_pool()
\ No newline at end of file
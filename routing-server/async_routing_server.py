@@ -0,0 +1,232 @@
+"""
+Asyncio-based routing server.
+
+Serves the same API as routing_server.py, but /work waits on the backend
+container with an async HTTP client instead of holding a thread per request,
+so thousands of in-flight jobs can be proxied by a single event loop.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from aiohttp import ClientTimeout, web
+
+from batching import AsyncMicroBatcher
+from connection_pools import AsyncConnectionPoolManager
+from container_manager import ContainerManager
+from event_stream import EVENT_STREAM_HEARTBEAT, KEEPALIVE, TooManySubscribersError
+from metrics import CONTENT_TYPE
+from snapshots import etag_matches
+from request_queue import QueueFullError, QueueTimeoutError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKEND_TIMEOUT = ClientTimeout(total=30)
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+}
+
+# Global container manager instance
+connection_pools = AsyncConnectionPoolManager()
+container_manager = ContainerManager(connection_pools=connection_pools, batcher=AsyncMicroBatcher(connection_pools))
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Enable CORS for all routes"""
+    if request.method == 'OPTIONS':
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers.update(CORS_HEADERS)
+    return response
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """Record the status and end-to-end latency of /work requests"""
+    if request.path != '/work' or request.method != 'POST':
+        return await handler(request)
+    start = time.perf_counter()
+    response = await handler(request)
+    container_manager.metrics.observe_work(response.status, time.perf_counter() - start)
+    return response
+
+
+def snapshot_response(request, name, build):
+    """Serve an endpoint's cached JSON, or 304 Not Modified if the client already has this version"""
+    etag, body = container_manager.snapshots.get(name, build)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, content_type='application/json', headers=headers)
+
+
+async def work(request):
+    """Handle work requests by routing to available containers"""
+    try:
+        # Get request data
+        data = (await request.json() if request.can_read_body else None) or {}
+        intensity = data.get('intensity', 1)
+        priority = data.get('priority', 0)
+        cost = container_manager.job_cost(intensity)
+
+        # Wait in the request queue until a container slot is reserved for us
+        waiter = await container_manager.request_queue.acquire_async(priority, cost)
+        container_id = waiter.container_id
+        container_manager.metrics.queue_wait.observe(waiter.queue_wait)
+
+        backend_start = time.perf_counter()
+        backend_ok = False
+        try:
+            # Get container URL and make request
+            container_url = container_manager.get_container_url(container_id)
+            if not container_url:
+                raise Exception(f"Could not get URL for container {container_id}")
+
+            if container_manager.batcher.accepts(intensity):
+                # Small jobs share a /batch request with others bound for the same container
+                result = await container_manager.batcher.submit(container_id, container_url, intensity)
+            else:
+                # Make request to the container's /heavy endpoint
+                session = container_manager.connection_pools.session(container_id)
+                async with session.post(f"{container_url}/heavy", json={'intensity': intensity},
+                                        timeout=BACKEND_TIMEOUT) as response:
+                    if response.status != 200:
+                        raise Exception(f"Container returned status {response.status}")
+                    result = await response.json()
+
+            backend_ok = True
+            container_manager.record_response(container_id, result.get('time_taken'), intensity)
+            result['container_id'] = container_id
+            result['container_url'] = container_url
+            result['queue_wait'] = waiter.queue_wait
+            return web.json_response(result)
+
+        finally:
+            container_manager.metrics.observe_backend(container_id, time.perf_counter() - backend_start, backend_ok)
+            # Always decrement load when done
+            container_manager.decrement_load(container_id, waiter.cost)
+
+    except QueueFullError as e:
+        logger.warning(f"Rejecting work request: {e}")
+        return web.json_response({'error': str(e)}, status=429)
+    except QueueTimeoutError as e:
+        logger.warning(f"Work request timed out in queue: {e}")
+        return web.json_response({'error': str(e)}, status=503)
+    except Exception as e:
+        logger.error(f"Error handling work request: {e}")
+        return web.json_response({'error': str(e)}, status=500)
+
+
+async def graph(request):
+    """Get container graph data for visualization"""
+    try:
+        return snapshot_response(request, 'graph', container_manager.get_graph_data)
+    except Exception as e:
+        logger.error(f"Error getting graph data: {e}")
+        return web.json_response({'error': str(e)}, status=500)
+
+
+async def status(request):
+    """Get current status of all containers"""
+    try:
+        return snapshot_response(request, 'status', container_manager.get_status_data)
+    except Exception as e:
+        logger.error(f"Error getting status: {e}")
+        return web.json_response({'error': str(e)}, status=500)
+
+
+async def events(request):
+    """Stream a snapshot of the containers, then their changes, as Server-Sent Events"""
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    try:
+        subscriber = container_manager.events.subscribe(wake=lambda: loop.call_soon_threadsafe(ready.set))
+    except TooManySubscribersError as e:
+        logger.warning(f"Rejecting event stream: {e}")
+        return web.json_response({'error': str(e)}, status=503)
+
+    # Headers go out with prepare(), before cors_middleware sees the response
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache',
+                                           'X-Accel-Buffering': 'no', **CORS_HEADERS})
+    try:
+        await response.prepare(request)
+        while True:
+            await response.write((container_manager.events.drain(subscriber) or KEEPALIVE).encode())
+            try:
+                await asyncio.wait_for(ready.wait(), EVENT_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                pass
+            ready.clear()
+    except ConnectionResetError:
+        return response
+    finally:
+        container_manager.events.unsubscribe(subscriber)
+
+
+async def timeseries(request):
+    """Get the recorded load history of a container or the fleet"""
+    try:
+        series = request.query.get('series')
+        if series is None:
+            return web.json_response({'series': container_manager.timeseries.keys(),
+                                      'resolutions': container_manager.timeseries.resolutions})
+        resolution = int(request.query.get('resolution', 1))
+        since = float(request.query.get('since', 0))
+        data = container_manager.timeseries.query(series, resolution, since)
+        if data is None:
+            return web.json_response({'error': f"Unknown series {series}"}, status=404)
+        return web.json_response(data)
+    except ValueError as e:
+        return web.json_response({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error getting time series: {e}")
+        return web.json_response({'error': str(e)}, status=500)
+
+
+async def metrics(request):
+    """Get request, backend and container metrics in the Prometheus text format"""
+    return web.Response(body=container_manager.metrics.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+
+async def health(request):
+    """Health check endpoint"""
+    return web.json_response({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+
+
+async def connection_pools_ctx(app):
+    """Bind the per-container connection pools to the server's event loop"""
+    container_manager.connection_pools.bind(asyncio.get_running_loop())
+    yield
+    await container_manager.connection_pools.close()
+
+
+async def on_shutdown(app):
+    """Shutdown the container manager"""
+    await asyncio.get_running_loop().run_in_executor(None, container_manager.shutdown)
+
+
+def create_app() -> web.Application:
+    """Build the aiohttp application"""
+    app = web.Application(middlewares=[cors_middleware, metrics_middleware])
+    app.cleanup_ctx.append(connection_pools_ctx)
+    app.on_shutdown.append(on_shutdown)
+    app.router.add_post('/work', work)
+    app.router.add_get('/graph', graph)
+    app.router.add_get('/status', status)
+    app.router.add_get('/events', events)
+    app.router.add_get('/timeseries', timeseries)
+    app.router.add_get('/metrics', metrics)
+    app.router.add_get('/health', health)
+    return app
+
+
+if __name__ == '__main__':
+    web.run_app(create_app(), host='0.0.0.0', port=8000)
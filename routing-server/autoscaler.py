@@ -0,0 +1,217 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Set to false to fall back to purely reactive scaling
+AUTOSCALE_ENABLED = os.environ.get('AUTOSCALE_ENABLED', 'true').lower() == 'true'
+# p95 /work latency in seconds the autoscaler sizes the fleet for
+AUTOSCALE_TARGET_P95 = float(os.environ.get('AUTOSCALE_TARGET_P95', '5'))
+# Seconds between autoscaling decisions
+AUTOSCALE_INTERVAL = float(os.environ.get('AUTOSCALE_INTERVAL', '1'))
+# Fewest containers scale-down leaves in service
+AUTOSCALE_MIN_REPLICAS = int(os.environ.get('AUTOSCALE_MIN_REPLICAS', '1'))
+# Most containers scale-up brings into service
+AUTOSCALE_MAX_REPLICAS = int(os.environ.get('AUTOSCALE_MAX_REPLICAS', '20'))
+# Seconds after a scale-up before the autoscaler adds more
+AUTOSCALE_UP_COOLDOWN = float(os.environ.get('AUTOSCALE_UP_COOLDOWN', '5'))
+# Seconds after any scaling before a container may be removed
+AUTOSCALE_DOWN_COOLDOWN = float(os.environ.get('AUTOSCALE_DOWN_COOLDOWN', '30'))
+# Seconds of recommendations scale-down looks back over; it follows the highest one
+AUTOSCALE_DOWN_WINDOW = float(os.environ.get('AUTOSCALE_DOWN_WINDOW', '60'))
+# Smoothing factor of the arrival rate moving average
+AUTOSCALE_RATE_ALPHA = float(os.environ.get('AUTOSCALE_RATE_ALPHA', '0.3'))
+# Recent response times kept to estimate the mean and p95 service time
+AUTOSCALE_SAMPLE_WINDOW = int(os.environ.get('AUTOSCALE_SAMPLE_WINDOW', '1000'))
+
+
+def erlang_c(servers: int, offered_load: float) -> float:
+    """Probability that a request has to wait in an M/M/c queue
+
+    offered_load is arrival rate x mean service time (Little's law for the
+    number of requests in service); it must be below servers.
+    """
+    # Erlang B by its stable recurrence, then converted to Erlang C
+    erlang_b = 1.0
+    for k in range(1, servers + 1):
+        erlang_b = offered_load * erlang_b / (k + offered_load * erlang_b)
+    return servers * erlang_b / (servers - offered_load * (1 - erlang_b))
+
+
+def wait_p95(servers: int, arrival_rate: float, service_rate: float) -> float:
+    """Predicted 95th percentile of queueing delay in an M/M/c queue, inf if it can't keep up"""
+    if servers <= 0:
+        return math.inf if arrival_rate > 0 else 0.0
+    spare_rate = servers * service_rate - arrival_rate
+    if spare_rate <= 0:
+        return math.inf
+    waiting = erlang_c(servers, arrival_rate / service_rate)
+    if waiting <= 0.05:
+        return 0.0
+    # P(wait > t) = C * exp(-spare_rate * t)
+    return math.log(waiting / 0.05) / spare_rate
+
+
+class Autoscaler:
+    """Sizes the container fleet for a p95 latency target from observed traffic
+
+    Every interval it updates a moving average of the request arrival rate
+    (from the request queue's counters) and takes the mean and p95 service
+    time of the last AUTOSCALE_SAMPLE_WINDOW responses. It then models the fleet as an M/M/c queue with
+    MAX_LOAD_PER_CONTAINER servers per worker process of each container and
+    picks the fewest containers whose predicted queueing delay p95, plus
+    the observed service time p95, meets the target. The current queue
+    also has to drain within the target. Scale-up happens at once, after a
+    short cooldown. Scale-down follows the highest recommendation of the
+    last AUTOSCALE_DOWN_WINDOW seconds and drains one container at a time,
+    so brief lulls don't shrink the fleet and no request in flight is cut
+    off.
+    """
+
+    def __init__(self, container_manager, slots_per_replica: int,
+                 target_p95: float = AUTOSCALE_TARGET_P95, interval: float = AUTOSCALE_INTERVAL,
+                 min_replicas: int = AUTOSCALE_MIN_REPLICAS, max_replicas: int = AUTOSCALE_MAX_REPLICAS):
+        self.container_manager = container_manager
+        self.slots_per_replica = slots_per_replica
+        self.target_p95 = target_p95
+        self.interval = interval
+        self.min_replicas = min_replicas
+        self.max_replicas = max_replicas
+        self.service_times: deque = deque(maxlen=AUTOSCALE_SAMPLE_WINDOW)
+        self.recommendations: deque = deque()
+        self.arrival_rate = 0.0
+        self.last_arrivals = None
+        self.last_tick = None
+        self.last_replicas = 0
+        self.last_scale_up = 0.0
+        self.last_scale_change = 0.0
+        self.last_decision = None
+        self.desired = 0
+        self.thread = None
+        self.active = False
+
+    def start(self):
+        """Start making scaling decisions in a background thread"""
+        if self.thread is None or not self.thread.is_alive():
+            self.active = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            logger.info(f"Autoscaler started with a p95 target of {self.target_p95}s")
+
+    def stop(self):
+        self.active = False
+
+    def record_service_time(self, seconds: float):
+        """Feed back a completed request's time_taken"""
+        self.service_times.append(seconds)
+
+    def _run(self):
+        while self.active:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Error in autoscaler: {e}")
+            time.sleep(self.interval)
+
+    def _queue_counters(self):
+        """Get the number of requests that ever arrived and how many are queued now"""
+        # Every request that arrived was granted, rejected or timed out, or is still queued
+        stats = self.container_manager.request_queue.get_stats()
+        return stats['granted'] + stats['rejected'] + stats['timed_out'] + stats['depth'], stats['depth']
+
+    def _service_mean(self) -> Optional[float]:
+        # Over the whole window; a moving average of a mixed workload swings with whichever jobs just finished
+        samples = list(self.service_times)
+        return sum(samples) / len(samples) if samples else None
+
+    def _service_p95(self) -> float:
+        samples = sorted(self.service_times)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def desired_replicas(self, arrival_rate: float, service_time: Optional[float],
+                         service_p95: float, queue_depth: int) -> int:
+        """Fewest containers predicted to keep p95 latency within the target"""
+        if not service_time or (arrival_rate <= 0 and queue_depth == 0):
+            return 0
+        service_rate = 1 / service_time
+        wait_budget = max(self.target_p95 - service_p95, 0.0)
+        for replicas in range(1, self.max_replicas + 1):
+            servers = replicas * self.slots_per_replica
+            # Requests already queued have to be served within the target on top of new arrivals
+            drains = servers * service_rate * self.target_p95 >= queue_depth + arrival_rate * self.target_p95
+            if drains and wait_p95(servers, arrival_rate, service_rate) <= wait_budget:
+                return replicas
+        return self.max_replicas
+
+    def tick(self):
+        """Update the traffic estimates and scale the fleet toward the desired size"""
+        now = time.time()
+        arrivals, queue_depth = self._queue_counters()
+        if self.last_tick is not None and now > self.last_tick:
+            rate = (arrivals - self.last_arrivals) / (now - self.last_tick)
+            self.arrival_rate = AUTOSCALE_RATE_ALPHA * rate + (1 - AUTOSCALE_RATE_ALPHA) * self.arrival_rate
+        self.last_arrivals = arrivals
+        self.last_tick = now
+
+        manager = self.container_manager
+        current = manager.serving
+        replicas = current + manager.provisioning
+        if current > self.last_replicas:
+            # Containers added outside the autoscaler, e.g. by the request queue, hold off scale-down too
+            self.last_scale_change = now
+        self.last_replicas = current
+
+        desired = self.desired_replicas(self.arrival_rate, self._service_mean(), self._service_p95(), queue_depth)
+        self.desired = desired = max(desired, min(self.min_replicas, current))
+        self.recommendations.append((now, desired))
+        while self.recommendations and self.recommendations[0][0] < now - AUTOSCALE_DOWN_WINDOW:
+            self.recommendations.popleft()
+
+        if desired > replicas:
+            if now - self.last_scale_up < AUTOSCALE_UP_COOLDOWN:
+                return
+            count = desired - replicas
+            logger.info(f"Autoscaler scaling up by {count} to {desired} containers "
+                        f"({self.arrival_rate:.2f} req/s, {queue_depth} queued)")
+            manager.scale_up(count)
+            self.last_scale_up = self.last_scale_change = now
+            self.last_decision = {'action': 'scale_up', 'count': count, 'at': now}
+            return
+
+        # Hysteresis: only shrink when every recent recommendation was below the current size
+        recent_peak = max(recommended for _, recommended in self.recommendations)
+        if recent_peak < current and manager.provisioning == 0 and now - self.last_scale_change >= AUTOSCALE_DOWN_COOLDOWN:
+            if manager.scale_down_one():
+                self.last_scale_change = now
+                self.last_replicas = manager.serving
+                self.last_decision = {'action': 'scale_down', 'count': 1, 'at': now}
+
+    def get_stats(self) -> dict:
+        """Get the traffic estimates and the latest decision"""
+        manager = self.container_manager
+        service_time = self._service_mean()
+        current = manager.serving
+        predicted = None
+        if service_time:
+            servers = current * self.slots_per_replica
+            wait = wait_p95(servers, self.arrival_rate, 1 / service_time)
+            predicted = None if math.isinf(wait) else round(wait + self._service_p95(), 3)
+        return {
+            'enabled': self.active,
+            'target_p95_seconds': self.target_p95,
+            'arrival_rate': round(self.arrival_rate, 3),
+            'service_time_seconds': service_time,
+            'service_p95_seconds': self._service_p95(),
+            'current_replicas': current,
+            'provisioning': manager.provisioning,
+            'desired_replicas': self.desired,
+            'predicted_p95_seconds': predicted,
+            'last_decision': self.last_decision
+        }
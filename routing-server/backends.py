@@ -0,0 +1,338 @@
+import atexit
+import logging
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+import docker
+
+from docker_events import CONTAINER_LABELS, CONTAINER_LABEL_FILTER, DockerEventWatcher
+
+logger = logging.getLogger(__name__)
+
+# Backend that runs main-server instances, see BACKENDS
+CONTAINER_BACKEND = os.environ.get('CONTAINER_BACKEND', 'docker')
+# main-server entry point the process backend runs
+MAIN_SERVER_PATH = os.environ.get(
+    'MAIN_SERVER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main-server', 'server.py')
+)
+# CPUs each main-server container may use; it runs one worker process per CPU. 0 leaves it unlimited, with one worker
+CONTAINER_CPUS = float(os.environ.get('CONTAINER_CPUS', '0'))
+# Seconds between checks of whether process backend servers are still alive
+PROCESS_POLL_INTERVAL = float(os.environ.get('PROCESS_POLL_INTERVAL', '0.2'))
+
+
+class ContainerBackend:
+    """Runs main-server instances for the container manager
+
+    An instance is created with a name and a host port, started, and later
+    stopped, which also removes it. inspect() returns a dict with at least
+    'status' ('running' when it can take requests) and 'address' (the URL
+    the router should send requests to), or None once the instance is
+    gone. Backends report instances that die by calling the handler given
+    to watch() with a Docker-style event dict ('id' and 'Action').
+    """
+
+    name = None
+
+    def create(self, name: str, port: int) -> str:
+        """Create an instance without starting it and return its ID"""
+        raise NotImplementedError
+
+    def start(self, container_id: str):
+        """Start a created instance"""
+        raise NotImplementedError
+
+    def stop(self, container_id: str):
+        """Stop and remove an instance; does nothing if it is already gone"""
+        raise NotImplementedError
+
+    def inspect(self, container_id: str) -> Optional[dict]:
+        """Get an instance's status and address, or None if it doesn't exist"""
+        raise NotImplementedError
+
+    def address(self, container_id: str) -> Optional[str]:
+        """Get the URL requests to an instance are sent to"""
+        info = self.inspect(container_id)
+        return info['address'] if info else None
+
+    def probe_address(self, container_id: str) -> Optional[str]:
+        """Get the URL the readiness check polls"""
+        return self.address(container_id)
+
+    def list_running(self) -> Dict[str, dict]:
+        """Inspect every running instance this backend started, keyed by ID"""
+        raise NotImplementedError
+
+    def watch(self, handler: Callable[[dict], None]):
+        """Start reporting lifecycle events to handler"""
+
+    def unwatch(self):
+        """Stop reporting lifecycle events"""
+
+    @property
+    def watching(self) -> bool:
+        """Whether lifecycle events are currently being delivered"""
+        return False
+
+    def get_stats(self) -> dict:
+        """Get the backend's name and event delivery state"""
+        return {'name': self.name, 'watching': self.watching}
+
+
+class DockerBackend(ContainerBackend):
+    """Runs main-server:latest containers through the Docker daemon"""
+
+    name = 'docker'
+
+    def __init__(self, client=None):
+        self.client = client or docker.from_env()
+        self.ports: Dict[str, int] = {}
+        self.event_watcher = None
+
+    def create(self, name: str, port: int) -> str:
+        # Check if image exists locally
+        try:
+            self.client.images.get('main-server:latest')
+            logger.info("Using existing main-server:latest image")
+        except docker.errors.ImageNotFound:
+            logger.error("main-server:latest image not found locally")
+            logger.error("Please build the main-server image first using:")
+            logger.error("cd main-server && docker build -t main-server:latest .")
+            raise Exception("main-server:latest image not found. Please build it first.")
+
+        # Get the current network name for the routing server
+        current_network = None
+        try:
+            # Get the routing server's network
+            routing_container = self.client.containers.get('mp-test-routing-server-1')
+            routing_container.reload()
+            network_settings = routing_container.attrs.get('NetworkSettings', {})
+            networks = network_settings.get('Networks', {})
+            current_network = list(networks.keys())[0] if networks else None
+            logger.info(f"Using network: {current_network}")
+        except Exception as e:
+            logger.warning(f"Could not get current network: {e}")
+
+        # Create the container on the same network as the routing server
+        container = self.client.containers.create(
+            image='main-server:latest',
+            name=name,
+            ports={5000: port},
+            environment={'PYTHONUNBUFFERED': '1'},
+            network=current_network,  # Use the same network as routing server
+            labels=CONTAINER_LABELS,  # Lets the event watcher and reconciliation find it
+            nano_cpus=int(CONTAINER_CPUS * 1e9) or None,  # CPU quota main-server sizes its workers by
+            auto_remove=False  # Keep container for debugging
+        )
+        self.ports[container.id] = port
+        return container.id
+
+    def start(self, container_id: str):
+        self.client.containers.get(container_id).start()
+
+    def stop(self, container_id: str):
+        self.ports.pop(container_id, None)
+        try:
+            container = self.client.containers.get(container_id)
+            container.stop(timeout=5)
+            container.remove()
+            logger.info(f"Removed container {container_id}")
+        except docker.errors.NotFound:
+            pass
+
+    def inspect(self, container_id: str) -> Optional[dict]:
+        try:
+            container = self.client.containers.get(container_id)
+        except docker.errors.NotFound:
+            return None
+        return self._info(container)
+
+    def probe_address(self, container_id: str) -> Optional[str]:
+        # Published port on the Docker host, reachable before the container's network address is known
+        port = self.ports.get(container_id)
+        return f"http://host.docker.internal:{port}" if port else None
+
+    def list_running(self) -> Dict[str, dict]:
+        return {
+            container.id: self._info(container)
+            for container in self.client.containers.list(sparse=True, filters={'label': CONTAINER_LABEL_FILTER})
+        }
+
+    def _info(self, container) -> dict:
+        return {'status': container.status, 'address': self._url_from_attrs(container.attrs)}
+
+    def _url_from_attrs(self, attrs: dict) -> Optional[str]:
+        """Build a container's URL from its inspected attributes"""
+        # Get the container's IP address from network settings
+        network_settings = attrs.get('NetworkSettings', {})
+        networks = network_settings.get('Networks', {})
+
+        # Try to find the IP from bridge network or default network
+        for network_name, network_info in networks.items():
+            if network_name != 'host':
+                ip_address = network_info.get('IPAddress')
+                if ip_address:
+                    return f"http://{ip_address}:5000"
+        return None
+
+    def watch(self, handler: Callable[[dict], None]):
+        self.event_watcher = DockerEventWatcher(self.client, handler)
+        self.event_watcher.start()
+
+    def unwatch(self):
+        if self.event_watcher:
+            self.event_watcher.stop()
+
+    @property
+    def watching(self) -> bool:
+        return bool(self.event_watcher and self.event_watcher.connected)
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        if self.event_watcher:
+            stats['events'] = self.event_watcher.get_stats()
+        return stats
+
+
+class ProcessBackend(ContainerBackend):
+    """Runs main-server/server.py as local subprocesses, one per port
+
+    Needs main-server's requirements installed alongside the router's, but
+    no Docker daemon, so scaling and routing can be benchmarked on a plain
+    Linux box.
+    """
+
+    name = 'process'
+
+    def __init__(self, server_path: str = MAIN_SERVER_PATH, host: str = '127.0.0.1',
+                 poll_interval: float = PROCESS_POLL_INTERVAL):
+        self.server_path = os.path.abspath(server_path)
+        self.host = host
+        self.poll_interval = poll_interval
+        self.instances: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self.handler = None
+        self.watch_thread = None
+        # Child servers would outlive the router otherwise
+        atexit.register(self.stop_all)
+
+    def create(self, name: str, port: int) -> str:
+        if not os.path.exists(self.server_path):
+            raise Exception(f"main-server not found at {self.server_path}")
+        container_id = uuid.uuid4().hex
+        with self.lock:
+            self.instances[container_id] = {'name': name, 'port': port, 'process': None, 'reported': False}
+        return container_id
+
+    def start(self, container_id: str):
+        with self.lock:
+            instance = self.instances[container_id]
+        # No cgroup quota to size workers by, so size them by CONTAINER_CPUS like Docker's quota
+        environment = dict(os.environ, PORT=str(instance['port']), WORKERS=str(max(1, math.ceil(CONTAINER_CPUS))),
+                           PYTHONUNBUFFERED='1')
+        instance['process'] = subprocess.Popen(
+            [sys.executable, self.server_path],
+            cwd=os.path.dirname(self.server_path),
+            env=environment,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        logger.info(f"Started {instance['name']} as process {instance['process'].pid} on port {instance['port']}")
+
+    def stop(self, container_id: str):
+        with self.lock:
+            instance = self.instances.pop(container_id, None)
+        process = instance and instance['process']
+        if process is None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        logger.info(f"Stopped process {process.pid} of {instance['name']}")
+
+    def stop_all(self):
+        """Stop every instance this backend started"""
+        with self.lock:
+            container_ids = list(self.instances)
+        for container_id in container_ids:
+            self.stop(container_id)
+
+    def inspect(self, container_id: str) -> Optional[dict]:
+        with self.lock:
+            instance = self.instances.get(container_id)
+        if instance is None:
+            return None
+        return self._info(instance)
+
+    def list_running(self) -> Dict[str, dict]:
+        with self.lock:
+            instances = list(self.instances.items())
+        running = {}
+        for container_id, instance in instances:
+            info = self._info(instance)
+            if info['status'] == 'running':
+                running[container_id] = info
+        return running
+
+    def _info(self, instance: dict) -> dict:
+        process = instance['process']
+        if process is None:
+            status = 'created'
+        elif process.poll() is None:
+            status = 'running'
+        else:
+            status = 'exited'
+        return {'status': status, 'address': f"http://{self.host}:{instance['port']}"}
+
+    def watch(self, handler: Callable[[dict], None]):
+        self.handler = handler
+        if self.watch_thread is None or not self.watch_thread.is_alive():
+            self.watch_thread = threading.Thread(target=self._watch, daemon=True)
+            self.watch_thread.start()
+
+    def unwatch(self):
+        self.handler = None
+        if self.watch_thread and self.watch_thread.is_alive():
+            self.watch_thread.join(timeout=5)
+
+    @property
+    def watching(self) -> bool:
+        return bool(self.handler and self.watch_thread and self.watch_thread.is_alive())
+
+    def _watch(self):
+        """Report processes that exited on their own as 'die' events"""
+        while self.handler is not None:
+            with self.lock:
+                instances = list(self.instances.items())
+            for container_id, instance in instances:
+                process = instance['process']
+                if process is None or instance['reported'] or process.poll() is None:
+                    continue
+                instance['reported'] = True
+                handler = self.handler
+                if handler is not None:
+                    handler({'id': container_id, 'Action': 'die', 'exitCode': process.returncode})
+            time.sleep(self.poll_interval)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (DockerBackend, ProcessBackend)
+}
+
+
+def create_backend(name: str = CONTAINER_BACKEND) -> ContainerBackend:
+    """Create a container backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown container backend {name!r}, choose one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
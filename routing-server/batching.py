@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+from aiohttp import ClientTimeout
+
+logger = logging.getLogger(__name__)
+
+# Seconds the first small job bound for a container waits for others before their batch is sent; 0 disables batching
+BATCH_WINDOW = float(os.environ.get('BATCH_WINDOW', '0'))
+# Jobs of at most this intensity are batched, larger ones keep their own /heavy request
+BATCH_MAX_INTENSITY = int(os.environ.get('BATCH_MAX_INTENSITY', '1'))
+# Most jobs sent to a container in one /batch request; a full batch is sent without waiting out the window
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', '16'))
+# Seconds a container may take to answer a whole batch
+BATCH_TIMEOUT = 30
+
+
+class BatchJobError(Exception):
+    """Raised when a container reports that a batched job failed"""
+
+
+class PendingJob:
+    """A job waiting for its line of a batch's response"""
+
+    def __init__(self, intensity):
+        self.intensity = intensity
+        self.result: Optional[dict] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None or self.error is not None
+
+    def resolve(self, result: dict):
+        self.result = result
+        self._notify()
+
+    def fail(self, error: Exception):
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        raise NotImplementedError
+
+
+class ThreadJob(PendingJob):
+    """Pending job of a request served on its own thread"""
+
+    def __init__(self, intensity):
+        super().__init__(intensity)
+        self.event = threading.Event()
+
+    def _notify(self):
+        self.event.set()
+
+
+class AsyncJob(PendingJob):
+    """Pending job of a request served by an asyncio event loop"""
+
+    def __init__(self, intensity):
+        super().__init__(intensity)
+        self.future = asyncio.get_running_loop().create_future()
+
+    def _notify(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class Batch:
+    """Jobs bound for one container that go out in a single /batch request"""
+
+    def __init__(self, container_id: str, container_url: str):
+        self.container_id = container_id
+        self.container_url = container_url
+        self.jobs: List[PendingJob] = []
+
+    def payload(self) -> dict:
+        return {'jobs': [{'kind': 'heavy', 'intensity': job.intensity} for job in self.jobs]}
+
+    def deliver(self, line: bytes):
+        """Hand one line of the container's response to the job it belongs to"""
+        item = json.loads(line)
+        job = self.jobs[item.pop('index')]
+        if 'error' in item:
+            job.fail(BatchJobError(item['error']))
+        else:
+            item['batch_size'] = len(self.jobs)
+            job.resolve(item)
+
+    def fail_pending(self, error: Exception):
+        """Fail every job the container has not answered"""
+        for job in self.jobs:
+            if not job.done:
+                job.fail(error)
+
+
+class ThreadBatch(Batch):
+    """Batch of the threaded router, with an event set once it takes no more jobs"""
+
+    def __init__(self, container_id: str, container_url: str):
+        super().__init__(container_id, container_url)
+        self.closed = threading.Event()
+
+
+class AsyncBatch(Batch):
+    """Batch of the async router, with the timer that sends it when the window closes"""
+
+    def __init__(self, container_id: str, container_url: str):
+        super().__init__(container_id, container_url)
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class BaseMicroBatcher:
+    """Groups small jobs reserved on the same container into one /batch request
+
+    The first small job for a container opens a batch and later ones join
+    it until the window has passed or the batch is full. Every job has
+    already reserved its own slot, so load accounting is unchanged; what
+    is saved is an HTTP round-trip and its JSON per job. The container
+    streams one line per job as it finishes, so a short job is not held
+    back by a longer one in the same batch.
+    """
+
+    def __init__(self, connection_pools, window: float = BATCH_WINDOW, max_intensity: int = BATCH_MAX_INTENSITY,
+                 max_size: int = BATCH_MAX_SIZE):
+        self.connection_pools = connection_pools
+        self.window = window
+        self.max_intensity = max_intensity
+        self.max_size = max_size
+        self.open: Dict[str, Batch] = {}
+        self.batches_sent = 0
+        self.jobs_batched = 0
+        self.batches_failed = 0
+        self.lock = threading.Lock()
+
+    def accepts(self, intensity) -> bool:
+        """Check whether a job should go through a batch"""
+        return self.window > 0 and isinstance(intensity, int) and intensity <= self.max_intensity
+
+    def _sent(self, batch: Batch):
+        with self.lock:
+            self.batches_sent += 1
+            self.jobs_batched += len(batch.jobs)
+
+    def _failed(self, batch: Batch, error: Exception):
+        with self.lock:
+            self.batches_failed += 1
+        logger.error(f"Batch of {len(batch.jobs)} jobs to container {batch.container_id} failed: {error}")
+        batch.fail_pending(error)
+
+    @staticmethod
+    def _outcome(job: PendingJob) -> dict:
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def get_stats(self) -> dict:
+        """Get the batching settings and how many batches and jobs were sent"""
+        return {
+            'enabled': self.window > 0,
+            'window': self.window,
+            'max_intensity': self.max_intensity,
+            'max_size': self.max_size,
+            'batches_sent': self.batches_sent,
+            'jobs_batched': self.jobs_batched,
+            'batches_failed': self.batches_failed,
+            'mean_batch_size': round(self.jobs_batched / self.batches_sent, 2) if self.batches_sent else 0
+        }
+
+
+class MicroBatcher(BaseMicroBatcher):
+    """Micro-batching for the threaded router
+
+    The job that opens a batch waits out the window, then sends the batch
+    from a thread of its own, so it is answered by its own line like the
+    rest instead of after the whole response.
+    """
+
+    def submit(self, container_id: str, container_url: str, intensity) -> dict:
+        """Run a job as part of a batch to its container and return its result"""
+        job = ThreadJob(intensity)
+        with self.lock:
+            batch = self.open.get(container_id)
+            leader = batch is None
+            if leader:
+                batch = self.open[container_id] = ThreadBatch(container_id, container_url)
+            batch.jobs.append(job)
+            if len(batch.jobs) >= self.max_size:
+                self._close(batch)
+
+        if leader:
+            batch.closed.wait(self.window)
+            with self.lock:
+                self._close(batch)
+            threading.Thread(target=self._send, args=(batch,), daemon=True).start()
+        job.event.wait()
+        return self._outcome(job)
+
+    def _close(self, batch: ThreadBatch):
+        """Stop a batch taking more jobs; caller holds the lock"""
+        if self.open.get(batch.container_id) is batch:
+            del self.open[batch.container_id]
+        batch.closed.set()
+
+    def _send(self, batch: ThreadBatch):
+        self._sent(batch)
+        try:
+            response = self.connection_pools.post(batch.container_id, f"{batch.container_url}/batch",
+                                                  json=batch.payload(), stream=True, timeout=BATCH_TIMEOUT)
+            try:
+                if response.status_code != 200:
+                    raise Exception(f"Container returned status {response.status_code}")
+                for line in response.iter_lines():
+                    if line:
+                        batch.deliver(line)
+            finally:
+                response.close()
+            batch.fail_pending(Exception("Container did not answer every job of the batch"))
+        except Exception as e:
+            self._failed(batch, e)
+
+
+class AsyncMicroBatcher(BaseMicroBatcher):
+    """Micro-batching for the async router; batches are sent by their own task when the window closes"""
+
+    def __init__(self, connection_pools, **kwargs):
+        super().__init__(connection_pools, **kwargs)
+        # Keeps send tasks referenced until they finish
+        self.tasks = set()
+
+    async def submit(self, container_id: str, container_url: str, intensity) -> dict:
+        """Run a job as part of a batch to its container and return its result"""
+        job = AsyncJob(intensity)
+        batch = self.open.get(container_id)
+        if batch is None:
+            batch = self.open[container_id] = AsyncBatch(container_id, container_url)
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush, batch)
+        batch.jobs.append(job)
+        if len(batch.jobs) >= self.max_size:
+            self._flush(batch)
+        # Shielded so a request given up on does not take the rest of its batch with it
+        await asyncio.shield(job.future)
+        return self._outcome(job)
+
+    def _flush(self, batch: AsyncBatch):
+        """Close a batch and send it from a task of its own"""
+        if self.open.get(batch.container_id) is not batch:
+            return
+        del self.open[batch.container_id]
+        batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _send(self, batch: AsyncBatch):
+        self._sent(batch)
+        try:
+            session = self.connection_pools.session(batch.container_id)
+            async with session.post(f"{batch.container_url}/batch", json=batch.payload(),
+                                    timeout=ClientTimeout(total=BATCH_TIMEOUT)) as response:
+                if response.status != 200:
+                    raise Exception(f"Container returned status {response.status}")
+                async for line in response.content:
+                    if line.strip():
+                        batch.deliver(line)
+            batch.fail_pending(Exception("Container did not answer every job of the batch"))
+        except Exception as e:
+            self._failed(batch, e)
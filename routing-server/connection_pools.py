@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of keep-alive connections kept open to each container
+POOL_SIZE = int(os.environ.get('POOL_SIZE', '10'))
+# Seconds a container's pool may sit unused before its connections are closed
+POOL_IDLE_TIMEOUT = float(os.environ.get('POOL_IDLE_TIMEOUT', '60'))
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter that counts the requests it sends and the TCP connections it really opens
+
+    urllib3 reconnects a connection the server closed in place, so its own
+    counters report every request over such a connection as reused.
+    """
+
+    def __init__(self, **kwargs):
+        self.counter_lock = threading.Lock()
+        self.requests = 0
+        self.connects = 0
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        class CountingConnection(HTTPConnection):
+            def connect(self):
+                with adapter.counter_lock:
+                    adapter.connects += 1
+                super().connect()
+
+        class CountingConnectionPool(HTTPConnectionPool):
+            ConnectionCls = CountingConnection
+
+        self.poolmanager.pool_classes_by_scheme = {'http': CountingConnectionPool, 'https': HTTPSConnectionPool}
+
+    def send(self, request, **kwargs):
+        with self.counter_lock:
+            self.requests += 1
+        return super().send(request, **kwargs)
+
+    def counters(self, reset: bool = False):
+        """Get reused (hit) and newly opened (miss) connections, optionally starting over from zero"""
+        with self.counter_lock:
+            hits, misses = max(0, self.requests - self.connects), self.connects
+            if reset:
+                self.requests = self.connects = 0
+        return hits, misses
+
+
+class ConnectionPoolManager:
+    """Per-container keep-alive HTTP connection pools for the threaded router"""
+
+    def __init__(self, pool_size: int = POOL_SIZE, idle_timeout: float = POOL_IDLE_TIMEOUT):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, requests.Session] = {}
+        self.last_used: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        # Counters of pools that have already been closed
+        self.retired_hits = 0
+        self.retired_misses = 0
+
+    def open_pool(self, container_id: str):
+        """Open a connection pool for a newly registered container"""
+        session = requests.Session()
+        adapter = CountingAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        with self.lock:
+            self.sessions[container_id] = session
+            self.last_used[container_id] = time.monotonic()
+        logger.info(f"Opened connection pool for container {container_id}")
+
+    def drop_pool(self, container_id: str):
+        """Close the connection pool of a removed container"""
+        with self.lock:
+            session = self.sessions.pop(container_id, None)
+            self.last_used.pop(container_id, None)
+            if session is None:
+                return
+            self._retire_counters(session)
+        session.close()
+        logger.info(f"Dropped connection pool for container {container_id}")
+
+    def reap_idle(self):
+        """Close the connections of pools that have been idle for too long"""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self.lock:
+            idle = [(cid, self.sessions[cid]) for cid, last_used in self.last_used.items()
+                    if last_used < cutoff]
+            for container_id, session in idle:
+                self._retire_counters(session)
+                # Keep the session; it opens new pools on demand
+                session.close()
+                self.last_used[container_id] = time.monotonic()
+
+    def post(self, container_id: str, url: str, **kwargs) -> requests.Response:
+        """POST to a container through its pool"""
+        with self.lock:
+            session = self.sessions.get(container_id)
+            if session is not None:
+                self.last_used[container_id] = time.monotonic()
+        if session is None:
+            # Container was not registered through open_pool; don't keep a pool for it
+            return requests.post(url, **kwargs)
+        return session.post(url, **kwargs)
+
+    def _retire_counters(self, session: requests.Session):
+        """Fold the counters of a session's pools into the retired totals"""
+        hits, misses = session.get_adapter('http://').counters(reset=True)
+        self.retired_hits += hits
+        self.retired_misses += misses
+
+    @staticmethod
+    def _session_counters(session: requests.Session):
+        """Count reused (hit) and newly opened (miss) connections of a session"""
+        return session.get_adapter('http://').counters()
+
+    def get_stats(self) -> dict:
+        """Get pool configuration and hit/miss counters"""
+        with self.lock:
+            per_container = {}
+            hits, misses = self.retired_hits, self.retired_misses
+            for container_id, session in self.sessions.items():
+                container_hits, container_misses = self._session_counters(session)
+                per_container[container_id] = {'hits': container_hits, 'misses': container_misses}
+                hits += container_hits
+                misses += container_misses
+        return {
+            'pool_size': self.pool_size,
+            'idle_timeout': self.idle_timeout,
+            'open_pools': len(per_container),
+            'hits': hits,
+            'misses': misses,
+            'containers': per_container
+        }
+
+
+class AsyncConnectionPoolManager:
+    """Per-container keep-alive HTTP connection pools for the async router
+
+    Sessions live on the event loop passed to bind(); open_pool and drop_pool
+    may be called from any thread.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, idle_timeout: float = POOL_IDLE_TIMEOUT):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.loop = None
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self.retired_hits = 0
+        self.retired_misses = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Bind the pools to the event loop that will use them"""
+        self.loop = loop
+
+    def open_pool(self, container_id: str):
+        """Open a connection pool for a newly registered container"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.session, container_id)
+
+    def drop_pool(self, container_id: str):
+        """Close the connection pool of a removed container"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._drop_pool, container_id)
+
+    def reap_idle(self):
+        """Idle connections are closed by the connector's keep-alive timeout"""
+
+    def session(self, container_id: str) -> aiohttp.ClientSession:
+        """Get the session for a container, opening its pool if needed"""
+        session = self.sessions.get(container_id)
+        if session is None:
+            counters = {'hits': 0, 'misses': 0}
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._count(counters, 'misses'))
+            trace_config.on_connection_reuseconn.append(self._count(counters, 'hits'))
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size,
+                                             keepalive_timeout=self.idle_timeout)
+            session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+            self.sessions[container_id] = session
+            self.counters[container_id] = counters
+            logger.info(f"Opened connection pool for container {container_id}")
+        return session
+
+    def _drop_pool(self, container_id: str):
+        session = self.sessions.pop(container_id, None)
+        counters = self.counters.pop(container_id, None)
+        if session is None:
+            return
+        self.retired_hits += counters['hits']
+        self.retired_misses += counters['misses']
+        self.loop.create_task(session.close())
+        logger.info(f"Dropped connection pool for container {container_id}")
+
+    @staticmethod
+    def _count(counters: Dict[str, int], key: str):
+        async def on_event(session, trace_config_ctx, params):
+            counters[key] += 1
+        return on_event
+
+    async def close(self):
+        """Close every pool"""
+        for container_id in list(self.sessions.keys()):
+            await self.sessions.pop(container_id).close()
+
+    def get_stats(self) -> dict:
+        """Get pool configuration and hit/miss counters"""
+        per_container = {cid: dict(counters) for cid, counters in list(self.counters.items())}
+        return {
+            'pool_size': self.pool_size,
+            'idle_timeout': self.idle_timeout,
+            'open_pools': len(per_container),
+            'hits': self.retired_hits + sum(c['hits'] for c in per_container.values()),
+            'misses': self.retired_misses + sum(c['misses'] for c in per_container.values()),
+            'containers': per_container
+        }
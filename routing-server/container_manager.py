@@ -0,0 +1,729 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import logging
+from typing import Dict, Optional, Tuple
+import uuid
+from autoscaler import AUTOSCALE_ENABLED, AUTOSCALE_MAX_REPLICAS, Autoscaler
+from backends import create_backend
+from batching import MicroBatcher
+from connection_pools import ConnectionPoolManager
+from cost_model import CostModel
+from event_stream import EventStream
+from load_tracker import LoadTracker
+from metrics import RouterMetrics
+from provisioner import Provisioner
+from readiness import ReadinessProbe
+from request_queue import RequestQueue
+from snapshots import SnapshotCache
+from strategies import create_strategy
+from timeseries import TimeSeriesStore
+from topology import ROUTER_NODE_ID, Topology
+
+logger = logging.getLogger(__name__)
+
+# Load a container accepts per worker process before it is considered busy, in cost units (an average job costs 1)
+MAX_LOAD_PER_CONTAINER = int(os.environ.get('MAX_LOAD_PER_CONTAINER', '3'))
+# Weight container load by each job's learned cost instead of counting every job as 1
+COST_AWARE_ROUTING = os.environ.get('COST_AWARE_ROUTING', 'false').lower() == 'true'
+# Seconds to wait before trying again after a failed scale-up
+SCALE_UP_RETRY_DELAY = float(os.environ.get('SCALE_UP_RETRY_DELAY', '5'))
+# Number of started, health-checked containers kept in reserve for bursts
+WARM_POOL_SIZE = int(os.environ.get('WARM_POOL_SIZE', '1'))
+# Seconds a container being scaled down may take to finish its in-flight requests before it is stopped
+DRAIN_TIMEOUT = float(os.environ.get('DRAIN_TIMEOUT', '30'))
+# Seconds between samples of container and fleet load in the time-series store
+TIMESERIES_SAMPLE_INTERVAL = float(os.environ.get('TIMESERIES_SAMPLE_INTERVAL', '1'))
+# Fleet-wide series recorded next to each container's load
+FLEET_SERIES = ('total_load', 'total_weighted_load', 'containers', 'queue_depth')
+# Seconds between polls of the backend that catch anything its events missed
+RECONCILE_INTERVAL = float(os.environ.get('RECONCILE_INTERVAL', '60'))
+
+class ContainerManager:
+    def __init__(self, connection_pools=None, backend=None, batcher=None):
+        self.backend = backend or create_backend()
+        self.connection_pools = connection_pools or ConnectionPoolManager()
+        self.batcher = batcher or MicroBatcher(self.connection_pools)
+        self.containers: Dict[str, dict] = {}
+        self.load_tracker = LoadTracker()
+        self.cost_model = CostModel()
+        self.strategy = create_strategy()
+        self.monitoring_thread = None
+        self.monitoring_active = True
+        self.timeseries = TimeSeriesStore()
+        self.topology = Topology()
+        self.metrics = RouterMetrics()
+        self.snapshots = SnapshotCache()
+        self.events = EventStream(self._event_state)
+        self.sampler_thread = None
+        self.container_urls: Dict[str, str] = {}
+        self.allocated_ports = set()
+        self.port_lock = threading.Lock()
+        self.warm_pool_target = WARM_POOL_SIZE
+        self.warm_pool: deque = deque()
+        self.warm_pool_refilling = 0
+        self.warm_pool_condition = threading.Condition()
+        self.refill_latencies: deque = deque(maxlen=50)
+        self.refill_thread = None
+        self.request_queue = RequestQueue(self)
+        self.provisioner = Provisioner(self)
+        self.readiness = ReadinessProbe()
+        self.drains: Dict[str, dict] = {}
+        self.autoscaler = Autoscaler(self, MAX_LOAD_PER_CONTAINER)
+        self.last_reconcile = 0.0
+        self._register_metrics()
+        self.backend.watch(self._handle_container_event)
+        self.start_monitoring()
+        self.start_sampling()
+        self.start_warm_pool()
+        self.events.start()
+        if AUTOSCALE_ENABLED:
+            self.autoscaler.start()
+    
+    def _register_metrics(self):
+        """Export fleet gauges and the time-to-ready histogram alongside the request metrics"""
+        registry = self.metrics.registry
+        registry.register('router_container_time_to_ready_seconds',
+                          "Seconds from starting a container to it serving /ready", self.readiness.time_to_ready)
+        registry.gauge('router_containers_serving', "Containers accepting new work", lambda: self.serving)
+        registry.gauge('router_containers_draining', "Containers draining before removal", lambda: len(self.drains))
+        registry.gauge('router_containers_provisioning', "Containers being started", lambda: self.provisioning)
+        registry.gauge('router_warm_pool_size', "Ready containers waiting in the warm pool", lambda: len(self.warm_pool))
+        registry.gauge('router_queue_depth', "/work requests waiting for a container slot", lambda: self.request_queue.depth)
+        registry.gauge('router_load', "Load units reserved on containers", self.load_tracker.total)
+    
+    def start_monitoring(self):
+        """Start the background monitoring thread"""
+        if self.monitoring_thread is None or not self.monitoring_thread.is_alive():
+            self.monitoring_thread = threading.Thread(target=self._monitor_containers, daemon=True)
+            self.monitoring_thread.start()
+            logger.info("Container monitoring started")
+    
+    def start_sampling(self):
+        """Start the background thread that records load into the time-series store"""
+        if self.sampler_thread is None or not self.sampler_thread.is_alive():
+            self.sampler_thread = threading.Thread(target=self._sample_timeseries, daemon=True)
+            self.sampler_thread.start()
+    
+    def _sample_timeseries(self):
+        """Record each container's load and the fleet totals, and update request rates, once per interval"""
+        while self.monitoring_active:
+            try:
+                now = time.time()
+                if self.topology.update(self.load_tracker.completed_snapshot(), now):
+                    self.snapshots.bump()
+                container_loads = self.load_tracker.count_snapshot()
+                for container_id, load in container_loads.items():
+                    self.timeseries.record(container_id, now, load)
+                self.timeseries.record('total_load', now, sum(container_loads.values()))
+                self.timeseries.record('total_weighted_load', now, self.load_tracker.total())
+                self.timeseries.record('containers', now, len(self.containers))
+                self.timeseries.record('queue_depth', now, self.request_queue.depth)
+                # A container removed while this pass ran may have had its series recreated
+                for key in self.timeseries.keys():
+                    if key not in FLEET_SERIES and key not in self.containers:
+                        self.timeseries.drop(key)
+            except Exception as e:
+                logger.error(f"Error sampling time series: {e}")
+            time.sleep(TIMESERIES_SAMPLE_INTERVAL)
+    
+    def start_warm_pool(self):
+        """Start the background thread that keeps the warm pool filled"""
+        if self.warm_pool_target <= 0:
+            return
+        if self.refill_thread is None or not self.refill_thread.is_alive():
+            self.refill_thread = threading.Thread(target=self._refill_warm_pool, daemon=True)
+            self.refill_thread.start()
+            logger.info(f"Warm pool started with target size {self.warm_pool_target}")
+    
+    def _refill_warm_pool(self):
+        """Keep warm_pool_target idle containers started and ready"""
+        while self.monitoring_active:
+            with self.warm_pool_condition:
+                while (self.monitoring_active and
+                       len(self.warm_pool) + self.warm_pool_refilling >= self.warm_pool_target):
+                    self.warm_pool_condition.wait(timeout=5)
+                if not self.monitoring_active:
+                    return
+                self.warm_pool_refilling += 1
+            self.snapshots.bump()
+            
+            start = time.time()
+            try:
+                warm_container = self._start_container()
+            except Exception as e:
+                logger.error(f"Error refilling warm pool: {e}")
+                with self.warm_pool_condition:
+                    self.warm_pool_refilling -= 1
+                self.snapshots.bump()
+                time.sleep(5)
+                continue
+            
+            refill_latency = time.time() - start
+            with self.warm_pool_condition:
+                self.warm_pool_refilling -= 1
+                if not self.monitoring_active:
+                    # Shut down while it was starting, nobody else will stop it
+                    self._stop_container(warm_container[0], warm_container[1]['port'])
+                    return
+                self.warm_pool.append(warm_container)
+                self.refill_latencies.append(refill_latency)
+                self.warm_pool_condition.notify_all()
+            self.snapshots.bump()
+            logger.info(f"Warm pool refilled with {warm_container[0]} in {refill_latency:.2f}s")
+    
+    def claim_warm_container(self) -> Optional[str]:
+        """Move a warm container into service, or return None if none is ready"""
+        with self.warm_pool_condition:
+            if not self.warm_pool:
+                return None
+            container_id, container_info = self.warm_pool.popleft()
+            # Wake the refill thread
+            self.warm_pool_condition.notify_all()
+        
+        self._register_container(container_id, container_info)
+        logger.info(f"Claimed warm container {container_info['name']}")
+        return container_id
+    
+    def acquire_new_container(self) -> str:
+        """Bring one more container into service, from the warm pool if one is ready"""
+        if not self.monitoring_active:
+            raise Exception("Container manager is shutting down")
+        container_id = self.claim_warm_container()
+        if container_id is not None:
+            return container_id
+        # Start one here rather than waiting for the refill thread, so a burst starts all its containers at once
+        return self.create_new_container()
+    
+    @property
+    def serving(self) -> int:
+        """Number of containers in service, not counting ones being drained"""
+        return len(self.containers) - len(self.drains)
+    
+    @property
+    def provisioning(self) -> int:
+        """Number of containers being brought into service"""
+        return self.provisioner.pending
+    
+    def request_capacity(self, waiting: int = 1):
+        """Bring enough containers into service in the background for the requests waiting
+        
+        Provisions already in flight count toward it, so repeated calls while
+        containers are starting don't start more.
+        """
+        if time.time() < self.provisioner.last_failure_at + SCALE_UP_RETRY_DELAY:
+            # Don't retry on every dispatch while container creation is failing
+            return
+        needed = math.ceil(waiting / self.autoscaler.slots_per_replica)
+        needed = min(needed, AUTOSCALE_MAX_REPLICAS - len(self.containers))
+        if needed > self.provisioner.pending:
+            logger.info(f"{waiting} requests are queued and no container is available, provisioning {needed}")
+        self.provisioner.ensure(needed)
+    
+    def scale_up(self, count: int):
+        """Bring count more containers into service in the background"""
+        self.provisioner.provision(count)
+    
+    def _check_warm_pool(self, running: Dict[str, dict]):
+        """Drop warm containers that are no longer running"""
+        with self.warm_pool_condition:
+            warm_container_ids = [container_id for container_id, _ in self.warm_pool]
+        for container_id in warm_container_ids:
+            if container_id not in running:
+                self._discard_warm_container(container_id)
+    
+    def _discard_warm_container(self, container_id: str) -> bool:
+        """Take a dead container out of the warm pool; returns False if it isn't in it"""
+        with self.warm_pool_condition:
+            for warm_container in self.warm_pool:
+                if warm_container[0] == container_id:
+                    self.warm_pool.remove(warm_container)
+                    self.snapshots.bump()
+                    self.warm_pool_condition.notify_all()
+                    break
+            else:
+                return False
+        logger.info(f"Warm container {container_id} is not running, discarding it")
+        self._stop_container(container_id, warm_container[1]['port'])
+        return True
+    
+    def get_warm_pool_stats(self) -> dict:
+        """Get warm pool depth and refill latency"""
+        with self.warm_pool_condition:
+            depth = len(self.warm_pool)
+            refilling = self.warm_pool_refilling
+            latencies = list(self.refill_latencies)
+        return {
+            'target': self.warm_pool_target,
+            'depth': depth,
+            'refilling': refilling,
+            'last_refill_seconds': latencies[-1] if latencies else None,
+            'avg_refill_seconds': sum(latencies) / len(latencies) if latencies else None
+        }
+    
+    def _monitor_containers(self):
+        """Continuously monitor containers and manage their lifecycle
+        
+        Container deaths arrive as events from the backend; polling it here is
+        only a slow reconciliation, or the fallback while events are not being
+        delivered.
+        """
+        while self.monitoring_active:
+            try:
+                if not self.backend.watching or time.time() - self.last_reconcile >= RECONCILE_INTERVAL:
+                    self._reconcile_containers()
+                
+                # Hand out any capacity a missed notification left unused
+                self.request_queue.dispatch()
+                
+                # Scale down if load is low, unless the autoscaler is sizing the fleet
+                if not self.autoscaler.active:
+                    self._scale_down_if_needed()
+                
+                # Close keep-alive connections nobody has used for a while
+                self.connection_pools.reap_idle()
+                
+                time.sleep(5)  # Monitor every 5 seconds
+                
+            except Exception as e:
+                logger.error(f"Error in monitoring loop: {e}")
+                time.sleep(10)
+    
+    def _reconcile_containers(self):
+        """Poll the backend once for running containers and drop tracked ones that are gone"""
+        self.last_reconcile = time.time()
+        running = self.backend.list_running()
+        
+        for container_id in list(self.containers):
+            container = running.get(container_id)
+            if container is None:
+                logger.info(f"Container {container_id} is not running, removing from tracking")
+                self._remove_container(container_id)
+                continue
+            # Keep the endpoint registry in sync with the backend
+            self._refresh_container_url(container_id, container['address'])
+        
+        # Drop dead containers from the warm pool
+        self._check_warm_pool(running)
+    
+    def _handle_container_event(self, event: dict):
+        """Update the registry as soon as the backend reports a container died or turned unhealthy"""
+        container_id = event.get('id') or event.get('Actor', {}).get('ID')
+        action = event.get('Action', '')
+        if action == 'health_status: healthy':
+            # Ends the readiness wait of a container that is starting
+            self.readiness.notify_healthy(container_id)
+            return
+        if action.startswith('health_status') and action != 'health_status: unhealthy':
+            return
+        
+        if container_id in self.containers:
+            logger.info(f"Container {container_id} reported {action}, removing from tracking")
+            self._remove_container(container_id)
+        else:
+            self._discard_warm_container(container_id)
+    
+    def _scale_down_if_needed(self):
+        """Scale down containers if total load is low"""
+        container_loads = self.load_tracker.snapshot()
+        total_load = sum(container_loads.values())
+        total_containers = len(self.containers)
+        
+        # If we have more than 1 container and total load is below two average jobs, scale down
+        if total_containers > 1 and total_load < 2:
+            self.scale_down_one()
+    
+    def scale_down_one(self) -> bool:
+        """Drain the least loaded container out of service; returns whether one started draining"""
+        container_loads = self.load_tracker.reservable_snapshot()
+        if len(container_loads) <= 1 or self.drains:
+            # Keep one container serving, and drain one at a time
+            return False
+        # Find the container with lowest load
+        container_id, load = min(container_loads.items(), key=lambda x: x[1])
+        logger.info(f"Scaling down - draining container {container_id} with load {load}")
+        return self.drain_container(container_id)
+    
+    def drain_container(self, container_id: str, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """Stop routing new work to a container and remove it once its in-flight requests finish"""
+        if not self.load_tracker.begin_drain(container_id):
+            return False
+        now = time.time()
+        self.drains[container_id] = {
+            'started_at': now,
+            'timeout': timeout,
+            'deadline': now + timeout,
+            'in_flight_at_start': self.load_tracker.get_count(container_id),
+            'idle': threading.Event()
+        }
+        self.snapshots.bump()
+        threading.Thread(target=self._drain, args=(container_id,), daemon=True).start()
+        return True
+    
+    def _drain(self, container_id: str):
+        """Wait for a draining container to go idle, or for its deadline, then remove it"""
+        drain = self.drains[container_id]
+        try:
+            # retire_if_idle also stops tracking it, so nothing can be reserved on it afterwards
+            while not self.load_tracker.retire_if_idle(container_id):
+                remaining = drain['deadline'] - time.time()
+                if remaining <= 0:
+                    logger.warning(f"Container {container_id} still has {self.load_tracker.get_count(container_id)} "
+                                   f"requests in flight after draining for {drain['timeout']}s, stopping it anyway")
+                    break
+                drain['idle'].wait(timeout=min(remaining, 1.0))
+                drain['idle'].clear()
+            logger.info(f"Container {container_id} drained in {time.time() - drain['started_at']:.2f}s")
+            self._remove_container(container_id)
+        finally:
+            self.drains.pop(container_id, None)
+            self.snapshots.bump()
+    
+    def get_drain_stats(self) -> dict:
+        """Get the progress of every container being drained"""
+        now = time.time()
+        return {
+            container_id: {
+                'in_flight': self.load_tracker.get_count(container_id),
+                'in_flight_at_start': drain['in_flight_at_start'],
+                'elapsed_seconds': round(now - drain['started_at'], 2),
+                'deadline_in_seconds': round(max(0.0, drain['deadline'] - now), 2)
+            }
+            for container_id, drain in list(self.drains.items())
+        }
+    
+    def _remove_container(self, container_id: str):
+        """Remove a container and clean up tracking"""
+        try:
+            # Popped in one step since the event watcher and monitor thread can race here
+            container_info = self.containers.pop(container_id, None)
+            if container_info is not None:
+                self.load_tracker.remove(container_id)
+                self.strategy.forget(container_id)
+                self.timeseries.drop(container_id)
+                self.topology.forget(container_id)
+                self.metrics.forget_container(container_id)
+                self.container_urls.pop(container_id, None)
+                self.connection_pools.drop_pool(container_id)
+                
+                self.snapshots.bump()
+                
+                # Stop and remove the container
+                self._stop_container(container_id, container_info['port'])
+                    
+        except Exception as e:
+            logger.error(f"Error removing container {container_id}: {e}")
+    
+    def _stop_container(self, container_id: str, port: int):
+        """Stop and remove a container and free its port"""
+        try:
+            self.backend.stop(container_id)
+            self.metrics.containers_removed.inc()
+        finally:
+            self._release_port(port)
+    
+    def job_cost(self, intensity) -> float:
+        """Estimate the cost of a job in load units from its intensity"""
+        if not COST_AWARE_ROUTING:
+            return 1.0
+        return self.cost_model.cost(intensity)
+    
+    def reserve_container(self, cost: float = 1.0) -> Optional[str]:
+        """Pick a container with the load-balancing strategy and reserve a slot on it in one step
+        
+        The slot is weighted by the job's cost, so a container is full once the
+        costs of its jobs reach its capacity. Returns None when every container
+        is full. The caller owns the slot and must give it back with
+        decrement_load and the same cost.
+        """
+        # Try candidates in the strategy's order of preference; a candidate can fill up
+        # or be retired between the snapshot and the reservation, so fall through to the next
+        start = time.perf_counter()
+        # Strategies compare loads against one limit, so scale each container's load to a single worker
+        loads = {
+            container_id: load / self.containers.get(container_id, {}).get('workers', 1)
+            for container_id, load in self.load_tracker.reservable_snapshot().items()
+        }
+        candidates = self.strategy.order(loads, MAX_LOAD_PER_CONTAINER)
+        reserved = next((container_id for container_id in candidates
+                         if self.load_tracker.try_reserve(container_id, self.capacity(container_id), cost)), None)
+        self.metrics.selection_duration.observe(time.perf_counter() - start)
+        if reserved is not None:
+            self.snapshots.bump()
+        return reserved
+    
+    def capacity(self, container_id: str) -> float:
+        """Get the load a container accepts, MAX_LOAD_PER_CONTAINER per worker process it runs"""
+        return MAX_LOAD_PER_CONTAINER * self.containers.get(container_id, {}).get('workers', 1)
+    
+    def create_new_container(self) -> str:
+        """Create a new main-server container"""
+        container_id, container_info = self._start_container()
+        if not self.monitoring_active:
+            # Shut down while it was starting, nobody else will stop it
+            self._stop_container(container_id, container_info['port'])
+            raise Exception("Container manager is shutting down")
+        self._register_container(container_id, container_info)
+        return container_id
+    
+    def _start_container(self) -> Tuple[str, dict]:
+        """Start a main-server container and wait until it is ready, without tracking it"""
+        # Generate unique container name
+        container_name = f"main-server-{uuid.uuid4().hex[:8]}"
+        
+        # Find available port
+        port = self._find_available_port()
+        container_id = None
+        
+        try:
+            container_id = self.backend.create(container_name, port)
+            started_at = time.time()
+            self.backend.start(container_id)
+            
+            # Wait for container to be ready and verify it's responding
+            time_to_ready = self.readiness.wait_until_ready(self.backend, container_id, started_at)
+            workers = self.readiness.concurrency(self.backend, container_id)
+            logger.info(f"Container {container_name} is ready after {time_to_ready:.2f}s with {workers} workers")
+            self.metrics.containers_started.inc()
+            
+            logger.info(f"Started container {container_name} with ID {container_id} on port {port}")
+            container_info = {
+                'name': container_name,
+                'port': port,
+                'workers': workers,
+                'created_at': datetime.now().isoformat()
+            }
+            return container_id, container_info
+            
+        except Exception as e:
+            logger.error(f"Error creating new container: {e}")
+            # Don't track failed containers
+            if container_id is not None:
+                try:
+                    self.backend.stop(container_id)
+                except Exception:
+                    pass
+            self._release_port(port)
+            raise
+    
+    def _register_container(self, container_id: str, container_info: dict):
+        """Start tracking a ready container and route work to it"""
+        self.containers[container_id] = container_info
+        self.load_tracker.add(container_id)
+        self.metrics.track_container(container_id)
+        # Containers run as many workers as their CPU quota allows; route and scale by that
+        workers = container_info.get('workers', 1)
+        self.strategy.set_weight(container_id, workers)
+        self.autoscaler.slots_per_replica = MAX_LOAD_PER_CONTAINER * workers
+        self._resolve_container_url(container_id)
+        self.connection_pools.open_pool(container_id)
+        self.snapshots.bump()
+        logger.info(f"Registered container {container_info['name']} with ID {container_id} on port {container_info['port']}")
+        
+        # Serve queued requests on the new container
+        self.request_queue.dispatch()
+    
+    def _find_available_port(self) -> int:
+        """Find an available port for the new container starting from 5002"""
+        with self.port_lock:
+            port = 5002  # Start from 5002 to avoid using 5001
+            while port in self.allocated_ports:
+                port += 1
+            self.allocated_ports.add(port)
+            return port
+    
+    def _release_port(self, port: int):
+        """Make a container's port available again"""
+        with self.port_lock:
+            self.allocated_ports.discard(port)
+    
+    
+    def get_container_url(self, container_id: str) -> str:
+        """Get the URL for a container from the endpoint registry"""
+        container_url = self.container_urls.get(container_id)
+        if container_url is None and container_id in self.containers:
+            # Not resolved yet (or invalidated), ask Docker once
+            container_url = self._resolve_container_url(container_id)
+        return container_url
+    
+    def _resolve_container_url(self, container_id: str) -> str:
+        """Resolve a container's URL through the backend and cache it"""
+        port = self.containers[container_id]['port'] if container_id in self.containers else None
+        try:
+            container_url = self.backend.address(container_id)
+            if container_url:
+                logger.info(f"Using container URL {container_url} for {container_id}")
+            else:
+                # Fallback to localhost (this won't work from inside Docker)
+                logger.warning(f"Could not get container IP for {container_id}, using localhost fallback")
+                container_url = f"http://localhost:{port}"
+            self.container_urls[container_id] = container_url
+            return container_url
+        except Exception as e:
+            logger.warning(f"Error getting container IP for {container_id}: {e}")
+            return f"http://localhost:{port}"
+    
+    def _refresh_container_url(self, container_id: str, container_url: Optional[str]):
+        """Update the endpoint registry if a container's address changed"""
+        if container_url and self.container_urls.get(container_id) != container_url:
+            logger.info(f"Container {container_id} endpoint changed to {container_url}")
+            self.container_urls[container_id] = container_url
+    
+    def decrement_load(self, container_id: str, cost: float = 1.0):
+        """Decrement the load counter for a container"""
+        self.load_tracker.release(container_id, cost)
+        self.snapshots.bump()
+        
+        # Let a drain finish as soon as its last request completes
+        drain = self.drains.get(container_id)
+        if drain is not None and self.load_tracker.get_count(container_id) == 0:
+            drain['idle'].set()
+        
+        # A slot freed up, serve the next queued request
+        self.request_queue.dispatch()
+    
+    def record_response(self, container_id: str, time_taken: float, intensity=None):
+        """Feed a completed request's time_taken back to the cost model and load-balancing strategy"""
+        if time_taken is not None:
+            self.cost_model.observe(intensity, time_taken)
+            self.strategy.record_latency(container_id, time_taken)
+            self.autoscaler.record_service_time(time_taken)
+    
+    def get_graph_data(self) -> dict:
+        """Get data for the graph visualization"""
+        container_loads = self.load_tracker.count_snapshot()
+        weighted_loads = self.load_tracker.snapshot()
+        containers = list(self.containers.items())
+        nodes = [self._graph_node(container_id, container_info, container_loads, weighted_loads)
+                 for container_id, container_info in containers]
+        # The routing server is the hub every container's edge starts from
+        nodes.insert(0, {
+            'id': ROUTER_NODE_ID,
+            'type': 'router',
+            'label': 'Routing Server',
+            'color': 'blue',
+            'load': sum(container_loads.values()),
+            'weighted_load': round(sum(weighted_loads.values()), 2),
+            'request_rate': round(sum(node['request_rate'] for node in nodes), 1)
+        })
+        
+        return {
+            'nodes': nodes,
+            # One router → container edge per container, weighted by its request rate
+            'edges': self.topology.get_edges(),
+            'timestamp': datetime.now().isoformat(),
+            'total_containers': len(containers),
+            'total_load': sum(container_loads.values()),
+            'total_weighted_load': round(sum(weighted_loads.values()), 2),
+            'warm_pool': self.get_warm_pool_stats()
+        }
+    
+    def _graph_node(self, container_id: str, container_info: dict,
+                    container_loads: Dict[str, int], weighted_loads: Dict[str, float]) -> dict:
+        """Build a container's node for the graph visualization"""
+        load = container_loads.get(container_id, 0)
+        weighted_load = weighted_loads.get(container_id, 0.0)
+        
+        # Determine node color based on load
+        if load == 0:
+            color = 'green'
+        elif weighted_load < self.capacity(container_id):
+            color = 'yellow'
+        else:
+            color = 'red'
+        
+        return {
+            'id': container_id,
+            'type': 'container',
+            'label': f"Container {container_info['name']}",
+            'name': container_info['name'],
+            'color': color,
+            'load': load,
+            'weighted_load': round(weighted_load, 2),
+            'state': 'draining' if container_id in self.drains else 'serving',
+            'request_rate': self.topology.rate(container_id),
+            'capacity': self.capacity(container_id),
+            'port': container_info['port'],
+            'created_at': container_info['created_at']
+        }
+    
+    def _event_state(self) -> Tuple[Dict[str, dict], dict]:
+        """Get the graph nodes by container ID and the fleet totals pushed to /events subscribers"""
+        container_loads = self.load_tracker.count_snapshot()
+        weighted_loads = self.load_tracker.snapshot()
+        nodes = {
+            container_id: self._graph_node(container_id, container_info, container_loads, weighted_loads)
+            for container_id, container_info in list(self.containers.items())
+        }
+        totals = {
+            'total_containers': len(nodes),
+            'total_load': sum(container_loads.values()),
+            'total_weighted_load': round(sum(weighted_loads.values()), 2)
+        }
+        return nodes, totals
+    
+    def get_status_data(self) -> dict:
+        """Get the current status of all containers"""
+        container_loads = self.load_tracker.count_snapshot()
+        weighted_loads = self.load_tracker.snapshot()
+        containers = list(self.containers.items())
+        status_data = {
+            'containers': {},
+            'total_containers': len(containers),
+            'total_load': sum(container_loads.values()),
+            'total_weighted_load': round(sum(weighted_loads.values()), 2),
+            'connection_pools': self.connection_pools.get_stats(),
+            'batching': self.batcher.get_stats(),
+            'warm_pool': self.get_warm_pool_stats(),
+            'request_queue': self.request_queue.get_stats(),
+            'load_balancing': self.strategy.get_stats(),
+            'cost_model': self.cost_model.get_stats(),
+            'autoscaler': self.autoscaler.get_stats(),
+            'provisioner': self.provisioner.get_stats(),
+            'readiness': self.readiness.get_stats(),
+            'backend': self.backend.get_stats(),
+            'draining': self.get_drain_stats(),
+            'events': self.events.get_stats(),
+            'snapshots': self.snapshots.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        for container_id, container_info in containers:
+            load = container_loads.get(container_id, 0)
+            status_data['containers'][container_id] = {
+                'name': container_info['name'],
+                'port': container_info['port'],
+                'load': load,
+                'weighted_load': round(weighted_loads.get(container_id, 0.0), 2),
+                'state': 'draining' if container_id in self.drains else 'serving',
+                'request_rate': self.topology.rate(container_id),
+                'workers': container_info.get('workers', 1),
+                'capacity': self.capacity(container_id),
+                'created_at': container_info['created_at']
+            }
+        
+        return status_data
+    
+    def shutdown(self):
+        """Shutdown the container manager"""
+        self.monitoring_active = False
+        self.events.stop()
+        self.autoscaler.stop()
+        self.provisioner.shutdown()
+        self.backend.unwatch()
+        with self.warm_pool_condition:
+            self.warm_pool_condition.notify_all()
+        if self.monitoring_thread and self.monitoring_thread.is_alive():
+            self.monitoring_thread.join(timeout=5)
+        
+        # Clean up all containers
+        for container_id in list(self.containers.keys()):
+            self._remove_container(container_id)
+        with self.warm_pool_condition:
+            warm_containers = list(self.warm_pool)
+            self.warm_pool.clear()
+        for container_id, container_info in warm_containers:
+            self._stop_container(container_id, container_info['port'])
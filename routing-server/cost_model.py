@@ -0,0 +1,74 @@
+import os
+import threading
+from typing import Dict
+
+# Smoothing factor of the per-intensity time_taken moving averages
+COST_EWMA_ALPHA = float(os.environ.get('COST_EWMA_ALPHA', '0.2'))
+
+
+class CostModel:
+    """Online estimate of how expensive a job is, learned from time_taken
+
+    Keeps an exponentially weighted moving average of the time_taken
+    returned for each intensity, plus one of seconds per unit of intensity
+    to estimate intensities that haven't been seen yet. A job's cost is its
+    estimated time relative to the average job, so an average job costs
+    1.0 load unit, as every job did before costs were tracked. The average
+    job is the cumulative mean over every job seen: a moving average over
+    a mixed workload swings with whichever jobs just finished, and would
+    reprice every job with it.
+    """
+
+    def __init__(self, alpha: float = COST_EWMA_ALPHA):
+        self.alpha = alpha
+        self.estimates: Dict[int, float] = {}
+        self.seconds_per_intensity = None
+        self.total_seconds = 0.0
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def _smooth(self, previous, value: float) -> float:
+        return value if previous is None else self.alpha * value + (1 - self.alpha) * previous
+
+    def observe(self, intensity, time_taken: float):
+        """Learn from a completed job's time_taken"""
+        if not isinstance(intensity, int) or intensity <= 0 or time_taken is None:
+            return
+        with self.lock:
+            self.estimates[intensity] = self._smooth(self.estimates.get(intensity), time_taken)
+            self.seconds_per_intensity = self._smooth(self.seconds_per_intensity, time_taken / intensity)
+            self.total_seconds += time_taken
+            self.samples += 1
+
+    def estimate_seconds(self, intensity):
+        """Estimate a job's time_taken, or None before anything was learned"""
+        with self.lock:
+            if intensity in self.estimates:
+                return self.estimates[intensity]
+            if self.seconds_per_intensity is not None and isinstance(intensity, int) and intensity > 0:
+                return self.seconds_per_intensity * intensity
+            return None
+
+    @property
+    def average_seconds(self):
+        """Mean time_taken of every job seen, or None before the first"""
+        return self.total_seconds / self.samples if self.samples else None
+
+    def cost(self, intensity) -> float:
+        """Estimate a job's cost in load units"""
+        seconds = self.estimate_seconds(intensity)
+        with self.lock:
+            average_seconds = self.average_seconds
+        if seconds is None or not average_seconds:
+            return 1.0
+        return seconds / average_seconds
+
+    def get_stats(self) -> dict:
+        """Get the learned estimates"""
+        with self.lock:
+            return {
+                'samples': self.samples,
+                'average_seconds': self.average_seconds,
+                'seconds_per_intensity': self.seconds_per_intensity,
+                'estimates': {str(intensity): seconds for intensity, seconds in sorted(self.estimates.items())}
+            }
@@ -0,0 +1,96 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Labels put on every main-server container the routing server starts
+CONTAINER_LABELS = {'mp-test.managed-by': 'routing-server'}
+# Docker filter that matches CONTAINER_LABELS
+CONTAINER_LABEL_FILTER = [f"{key}={value}" for key, value in CONTAINER_LABELS.items()]
+# Container lifecycle events the watcher subscribes to
+WATCHED_EVENTS = ['die', 'stop', 'oom', 'health_status']
+# Seconds to wait before resubscribing after the event stream broke
+EVENTS_RECONNECT_DELAY = float(os.environ.get('EVENTS_RECONNECT_DELAY', '1'))
+
+
+class DockerEventWatcher:
+    """Follows Docker's event stream for the containers the routing server manages
+
+    Each event is passed to handler as the decoded dict Docker sends. When
+    the stream breaks, the watcher resubscribes from the time of the last
+    event it saw, so events that happened while it was disconnected are
+    replayed rather than lost. connected is False while no stream is open,
+    which tells the monitor loop to fall back to polling.
+    """
+
+    def __init__(self, client, handler: Callable[[dict], None],
+                 reconnect_delay: float = EVENTS_RECONNECT_DELAY):
+        self.client = client
+        self.handler = handler
+        self.reconnect_delay = reconnect_delay
+        self.filters = {'type': 'container', 'event': WATCHED_EVENTS, 'label': CONTAINER_LABEL_FILTER}
+        self.thread = None
+        self.active = False
+        self.connected = False
+        self.stream = None
+        self.last_event_time: Optional[int] = None
+        self.events_seen = 0
+        self.reconnects = 0
+
+    def start(self):
+        """Start following events in a background thread"""
+        if self.thread is None or not self.thread.is_alive():
+            self.active = True
+            self.thread = threading.Thread(target=self._watch, daemon=True)
+            self.thread.start()
+            logger.info("Docker event watcher started")
+
+    def stop(self):
+        """Stop following events and close the stream"""
+        self.active = False
+        stream = self.stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5)
+
+    def _watch(self):
+        while self.active:
+            try:
+                self.stream = self.client.events(decode=True, filters=self.filters, since=self.last_event_time)
+                self.connected = True
+                for event in self.stream:
+                    self.last_event_time = event.get('time', self.last_event_time)
+                    self.events_seen += 1
+                    try:
+                        self.handler(event)
+                    except Exception as e:
+                        logger.error(f"Error handling Docker event {event.get('Action')}: {e}")
+                    if not self.active:
+                        break
+                if self.active:
+                    logger.warning("Docker event stream ended, resubscribing")
+            except Exception as e:
+                if self.active:
+                    logger.warning(f"Docker event stream failed: {e}")
+            finally:
+                self.connected = False
+                self.stream = None
+            if self.active:
+                self.reconnects += 1
+                time.sleep(self.reconnect_delay)
+
+    def get_stats(self) -> dict:
+        """Get connection state and event counters"""
+        return {
+            'connected': self.connected,
+            'events_seen': self.events_seen,
+            'reconnects': self.reconnects,
+            'last_event_time': self.last_event_time
+        }
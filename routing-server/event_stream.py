@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for container changes to push to /events subscribers
+EVENT_STREAM_INTERVAL = float(os.environ.get('EVENT_STREAM_INTERVAL', '0.5'))
+# Dashboards that may be subscribed to /events at the same time
+EVENT_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('EVENT_STREAM_MAX_SUBSCRIBERS', '50'))
+# Messages buffered per subscriber before it is dropped back to a fresh snapshot
+EVENT_STREAM_QUEUE_SIZE = int(os.environ.get('EVENT_STREAM_QUEUE_SIZE', '64'))
+# Seconds between keepalive comments on an idle stream
+EVENT_STREAM_HEARTBEAT = float(os.environ.get('EVENT_STREAM_HEARTBEAT', '15'))
+
+KEEPALIVE = ': keepalive\n\n'
+
+
+class TooManySubscribersError(Exception):
+    """Raised when a dashboard subscribes while EVENT_STREAM_MAX_SUBSCRIBERS are connected"""
+
+
+def format_event(event: str, data: dict, event_id: int) -> str:
+    """Encode a Server-Sent Events message"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    """One /events client's bounded backlog of messages
+
+    The publisher never waits on a subscriber: when a slow client's backlog
+    is full it is thrown away and the client is sent a fresh snapshot the
+    next time it reads.
+    """
+
+    def __init__(self, max_pending: int, wake: Optional[Callable[[], None]] = None):
+        self.pending: deque = deque()
+        self.max_pending = max_pending
+        self.ready = threading.Event()
+        self.wake = wake or self.ready.set
+        self.resync = True
+        self.seq = 0
+        self.resyncs = 0
+
+    def offer(self, seq: int, message: str):
+        if len(self.pending) >= self.max_pending:
+            self.pending.clear()
+            self.resync = True
+            self.resyncs += 1
+        else:
+            self.pending.append((seq, message))
+        self.wake()
+
+    def wait(self, timeout: float = EVENT_STREAM_HEARTBEAT):
+        """Block a worker thread until there is something to send or the heartbeat is due"""
+        self.ready.wait(timeout)
+        self.ready.clear()
+
+
+class EventStream:
+    """Pushes container changes to dashboards instead of having them poll
+
+    A background thread diffs the per-container graph nodes every
+    EVENT_STREAM_INTERVAL seconds while anyone is subscribed and publishes
+    the containers added, updated and removed as one delta. Each delta is
+    encoded once and shared by every subscriber. A new or lagging
+    subscriber starts from a snapshot taken under the same lock as the
+    deltas, so it skips the deltas the snapshot already covers.
+    """
+
+    def __init__(self, collect: Callable[[], Tuple[Dict[str, dict], dict]],
+                 interval: float = EVENT_STREAM_INTERVAL, max_subscribers: int = EVENT_STREAM_MAX_SUBSCRIBERS,
+                 queue_size: int = EVENT_STREAM_QUEUE_SIZE):
+        self.collect = collect
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.subscribers: List[Subscriber] = []
+        self.lock = threading.Lock()
+        self.nodes: Dict[str, dict] = {}
+        self.totals: dict = {}
+        self.seq = 0
+        self.snapshots = 0
+        self.active = False
+        self.thread = None
+
+    def start(self):
+        """Start the background thread that publishes deltas"""
+        if self.thread is None or not self.thread.is_alive():
+            self.active = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.active = False
+
+    def subscribe(self, wake: Optional[Callable[[], None]] = None) -> Subscriber:
+        """Add a subscriber; wake is called from the publisher thread when it has messages"""
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                raise TooManySubscribersError(f"Event stream is at its maximum of {self.max_subscribers} subscribers")
+            subscriber = Subscriber(self.queue_size, wake)
+            self.subscribers.append(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def drain(self, subscriber: Subscriber) -> str:
+        """Get the encoded messages a subscriber should be sent next, starting with a snapshot if it needs one"""
+        messages = []
+        if subscriber.resync:
+            subscriber.resync = False
+            subscriber.pending.clear()
+            snapshot, subscriber.seq = self._snapshot()
+            messages.append(snapshot)
+        while subscriber.pending:
+            seq, message = subscriber.pending.popleft()
+            if seq > subscriber.seq:
+                subscriber.seq = seq
+                messages.append(message)
+        return ''.join(messages)
+
+    def _snapshot(self) -> Tuple[str, int]:
+        with self.lock:
+            self._publish()
+            self.snapshots += 1
+            data = {'nodes': list(self.nodes.values()), **self.totals}
+            return format_event('snapshot', data, self.seq), self.seq
+
+    def _run(self):
+        while self.active:
+            time.sleep(self.interval)
+            if not self.subscribers:
+                continue
+            try:
+                with self.lock:
+                    self._publish()
+            except Exception as e:
+                logger.error(f"Error publishing container events: {e}")
+
+    def _publish(self):
+        """Diff the current nodes against the last published ones and send the changes; needs the lock"""
+        nodes, totals = self.collect()
+        previous = self.nodes
+        added = [node for container_id, node in nodes.items() if container_id not in previous]
+        updated = [node for container_id, node in nodes.items()
+                   if container_id in previous and previous[container_id] != node]
+        removed = [container_id for container_id in previous if container_id not in nodes]
+        totals_changed = totals != self.totals
+        self.nodes, self.totals = nodes, totals
+        if not (added or updated or removed or totals_changed):
+            return
+
+        self.seq += 1
+        message = format_event('delta', {'added': added, 'updated': updated, 'removed': removed, **totals}, self.seq)
+        for subscriber in self.subscribers:
+            try:
+                subscriber.offer(self.seq, message)
+            except Exception as e:
+                # The subscriber's event loop is gone; its handler unsubscribes it
+                logger.debug(f"Could not wake event subscriber: {e}")
+
+    def get_stats(self) -> dict:
+        """Get subscriber counts and how many messages have been published"""
+        with self.lock:
+            return {
+                'subscribers': len(self.subscribers),
+                'max_subscribers': self.max_subscribers,
+                'deltas': self.seq,
+                'snapshots': self.snapshots,
+                'resyncs': sum(subscriber.resyncs for subscriber in self.subscribers)
+            }
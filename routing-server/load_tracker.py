@@ -0,0 +1,122 @@
+import os
+import threading
+from typing import Dict, Set
+
+# Number of locks the per-container load counters are spread over
+LOAD_LOCK_STRIPES = int(os.environ.get('LOAD_LOCK_STRIPES', '16'))
+
+
+class LoadTracker:
+    """Concurrency-safe in-flight request accounting per container
+
+    Tracks both the number of requests running on each container and their
+    summed cost in load units, plus how many have completed on it. Each container's counters are guarded by one
+    of a fixed set of striped locks, so requests for different containers
+    rarely contend. Reads of the whole table take a snapshot instead of
+    locking every stripe. A draining container keeps its counters but
+    accepts no new reservations.
+    """
+
+    def __init__(self, stripes: int = LOAD_LOCK_STRIPES):
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.loads: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.completed: Dict[str, int] = {}
+        self.draining: Set[str] = set()
+
+    def _lock(self, container_id: str) -> threading.Lock:
+        return self.locks[hash(container_id) % len(self.locks)]
+
+    def add(self, container_id: str):
+        """Start tracking a container with no load"""
+        with self._lock(container_id):
+            if container_id not in self.loads:
+                self.counts[container_id] = 0
+                self.completed[container_id] = 0
+                self.loads[container_id] = 0.0
+
+    def remove(self, container_id: str):
+        """Stop tracking a container regardless of its load"""
+        with self._lock(container_id):
+            self.loads.pop(container_id, None)
+            self.counts.pop(container_id, None)
+            self.completed.pop(container_id, None)
+            self.draining.discard(container_id)
+
+    def begin_drain(self, container_id: str) -> bool:
+        """Stop handing out slots on a container; returns False if it isn't tracked or already draining"""
+        with self._lock(container_id):
+            if container_id not in self.loads or container_id in self.draining:
+                return False
+            self.draining.add(container_id)
+            return True
+
+    def retire_if_idle(self, container_id: str) -> bool:
+        """Stop tracking a container only if nothing is running on it
+
+        Once retired, no new slot can be reserved on the container.
+        """
+        with self._lock(container_id):
+            if self.counts.get(container_id, 0) > 0:
+                return False
+            self.loads.pop(container_id, None)
+            self.counts.pop(container_id, None)
+            self.completed.pop(container_id, None)
+            self.draining.discard(container_id)
+            return True
+
+    def try_reserve(self, container_id: str, limit: float, cost: float = 1.0) -> bool:
+        """Take a slot of the given cost on a container if it is tracked and below limit
+
+        The job's cost may take the container past limit; it then accepts
+        nothing more until enough work completes. This way an expensive job
+        never has to wait for a container to drain completely.
+        """
+        with self._lock(container_id):
+            load = self.loads.get(container_id)
+            if load is None or load >= limit or container_id in self.draining:
+                return False
+            self.loads[container_id] = load + cost
+            self.counts[container_id] += 1
+            return True
+
+    def release(self, container_id: str, cost: float = 1.0):
+        """Give back a slot taken with try_reserve"""
+        with self._lock(container_id):
+            if container_id in self.loads:
+                count = max(0, self.counts[container_id] - 1)
+                self.counts[container_id] = count
+                self.completed[container_id] += 1
+                # Reset to exactly zero when idle so float rounding can't accumulate
+                self.loads[container_id] = max(0.0, self.loads[container_id] - cost) if count else 0.0
+
+    def get(self, container_id: str) -> float:
+        """Get a container's current load in cost units"""
+        return self.loads.get(container_id, 0.0)
+
+    def get_count(self, container_id: str) -> int:
+        """Get the number of requests running on a container"""
+        return self.counts.get(container_id, 0)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Get a point-in-time copy of every container's load in cost units"""
+        return dict(self.loads)
+
+    def reservable_snapshot(self) -> Dict[str, float]:
+        """Get a point-in-time copy of the load of every container that isn't draining"""
+        loads = dict(self.loads)
+        for container_id in set(self.draining):
+            loads.pop(container_id, None)
+        return loads
+
+    def count_snapshot(self) -> Dict[str, int]:
+        """Get a point-in-time copy of every container's request count"""
+        return dict(self.counts)
+
+    def completed_snapshot(self) -> Dict[str, int]:
+        """Get a point-in-time copy of how many requests have completed on every container"""
+        return dict(self.completed)
+
+    def total(self) -> float:
+        """Get the load summed over all containers"""
+        return sum(self.snapshot().values())
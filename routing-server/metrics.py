@@ -0,0 +1,227 @@
+import bisect
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Sequence
+
+# Observations buffered by a metric before the recording thread folds them in itself
+PENDING_LIMIT = 4096
+# Default upper bounds in seconds of latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Buffered:
+    """Base of metrics that record without taking a lock
+
+    Recording appends to a deque, which is atomic, and the pending values
+    are folded into the totals under a lock only when the metric is read or
+    the buffer fills up, so concurrent requests never wait on each other.
+    """
+
+    def __init__(self):
+        self.pending: deque = deque()
+        self.lock = threading.Lock()
+
+    def _record(self, value: float):
+        self.pending.append(value)
+        if len(self.pending) > PENDING_LIMIT:
+            self._fold()
+
+    def _fold(self):
+        with self.lock:
+            pending = self.pending
+            while True:
+                try:
+                    self._apply(pending.popleft())
+                except IndexError:
+                    return
+
+    def _apply(self, value: float):
+        raise NotImplementedError
+
+
+class Counter(_Buffered):
+    """Monotonically increasing total"""
+
+    def __init__(self):
+        super().__init__()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self._record(amount)
+
+    def _apply(self, value: float):
+        self.value += value
+
+    def get(self) -> float:
+        self._fold()
+        return self.value
+
+
+class Histogram(_Buffered):
+    """Fixed-bucket histogram of observed values
+
+    Buckets are upper bounds, allocated up front; a value lands in the first
+    bucket it doesn't exceed, or in the overflow bucket past the last one.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__()
+        self.buckets: List[float] = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self._record(value)
+
+    def _apply(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """Get cumulative counts per bucket (the last one is +Inf), the sum and the count"""
+        self._fold()
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def get_stats(self) -> dict:
+        """Get cumulative bucket counts keyed by upper bound, plus the count and sum"""
+        cumulative, total, count = self.snapshot()
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {'buckets': dict(zip(bounds, cumulative)), 'count': count, 'sum': round(total, 3)}
+
+
+class Family:
+    """A metric split by one label, with a child metric per label value"""
+
+    def __init__(self, factory: Callable[[], _Buffered]):
+        self.factory = factory
+        self.children: Dict[str, _Buffered] = {}
+        self.lock = threading.Lock()
+
+    def labels(self, value: str) -> _Buffered:
+        child = self.children.get(value)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(value, self.factory())
+        return child
+
+    def remove(self, value: str):
+        """Stop exporting a label value, e.g. for a removed container"""
+        with self.lock:
+            self.children.pop(value, None)
+
+
+class MetricsRegistry:
+    """Named metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, help_text: str, label: str = None):
+        return self.register(name, help_text, Family(Counter) if label else Counter(), label)
+
+    def histogram(self, name: str, help_text: str, label: str = None, buckets: Sequence[float] = LATENCY_BUCKETS):
+        metric = Family(lambda: Histogram(buckets)) if label else Histogram(buckets)
+        return self.register(name, help_text, metric, label)
+
+    def gauge(self, name: str, help_text: str, func: Callable[[], float]):
+        """Register a value that is read from func whenever metrics are rendered"""
+        return self.register(name, help_text, func)
+
+    def register(self, name: str, help_text: str, metric, label: str = None):
+        self.metrics.append((name, help_text, metric, label))
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for name, help_text, metric, label in self.metrics:
+            if isinstance(metric, Family):
+                kind = 'counter' if metric.factory is Counter else 'histogram'
+                children = [(f'{label}="{value}"', child) for value, child in sorted(metric.children.items())]
+            else:
+                kind = 'gauge' if callable(metric) else 'counter' if isinstance(metric, Counter) else 'histogram'
+                children = [('', metric)]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, child in children:
+                if kind == 'gauge':
+                    lines.append(f"{name} {float(child())}")
+                elif kind == 'counter':
+                    lines.append(f"{name}{{{labels}}} {child.get()}" if labels else f"{name} {child.get()}")
+                else:
+                    lines.extend(self._render_histogram(name, labels, child))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(name: str, labels: str, histogram: Histogram) -> List[str]:
+        cumulative, total, count = histogram.snapshot()
+        prefix = f"{labels}," if labels else ''
+        lines = [
+            f'{name}_bucket{{{prefix}le="{bound}"}} {bucket_count}'
+            for bound, bucket_count in zip([*histogram.buckets, '+Inf'], cumulative)
+        ]
+        suffix = f"{{{labels}}}" if labels else ''
+        lines.append(f"{name}_sum{suffix} {total}")
+        lines.append(f"{name}_count{suffix} {count}")
+        return lines
+
+
+class RouterMetrics:
+    """The routing server's own request, backend and container lifecycle metrics"""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.work_requests = self.registry.counter(
+            'router_work_requests_total', "/work requests by response status", label='status')
+        self.work_duration = self.registry.histogram(
+            'router_work_duration_seconds', "End-to-end /work latency")
+        self.queue_wait = self.registry.histogram(
+            'router_queue_wait_seconds', "Time /work requests waited for a container slot")
+        self.selection_duration = self.registry.histogram(
+            'router_selection_duration_seconds', "Time spent picking and reserving a container",
+            buckets=[0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01])
+        self.backend_duration = self.registry.histogram(
+            'router_backend_duration_seconds', "Latency of /heavy calls by container", label='container')
+        self.backend_errors = self.registry.counter(
+            'router_backend_errors_total', "Failed /heavy calls by container", label='container')
+        self.containers_started = self.registry.counter(
+            'router_containers_started_total', "Containers started, including warm ones")
+        self.containers_removed = self.registry.counter(
+            'router_containers_removed_total', "Containers stopped and removed")
+
+    def observe_work(self, status: int, seconds: float):
+        self.work_requests.labels(str(status)).inc()
+        self.work_duration.observe(seconds)
+
+    def observe_backend(self, container_id: str, seconds: float, ok: bool = True):
+        # A request can outlive its container's drain; recording it would bring the removed series back
+        duration = self.backend_duration.children.get(container_id)
+        if duration is None:
+            return
+        duration.observe(seconds)
+        if not ok:
+            errors = self.backend_errors.children.get(container_id)
+            if errors is not None:
+                errors.inc()
+
+    def track_container(self, container_id: str):
+        # Series are created here and only looked up when observed, so a forgotten container's stay gone
+        self.backend_duration.labels(container_id)
+        self.backend_errors.labels(container_id)
+
+    def forget_container(self, container_id: str):
+        self.backend_duration.remove(container_id)
+        self.backend_errors.remove(container_id)
+
+    def render(self) -> str:
+        return self.registry.render()
@@ -0,0 +1,96 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Set
+
+logger = logging.getLogger(__name__)
+
+# Containers that may be starting at the same time
+PROVISION_WORKERS = int(os.environ.get('PROVISION_WORKERS', '20'))
+
+
+class Provisioner:
+    """Brings containers into service concurrently on a worker pool
+
+    Each provision is a future that resolves to the new container's ID.
+    provision() always starts more; ensure() only tops the number in
+    flight up to what it is asked for, so concurrent callers that need
+    capacity share the provisions already running instead of each starting
+    their own.
+    """
+
+    def __init__(self, container_manager, workers: int = PROVISION_WORKERS):
+        self.container_manager = container_manager
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='provision')
+        self.in_flight: Set[Future] = set()
+        # Reentrant since a future that is already done runs its callback while submit holds the lock
+        self.lock = threading.RLock()
+        self.started = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.last_failure_at = 0.0
+        self.durations: deque = deque(maxlen=50)
+
+    @property
+    def pending(self) -> int:
+        """Number of provisions in flight"""
+        return len(self.in_flight)
+
+    def provision(self, count: int) -> List[Future]:
+        """Start count more containers"""
+        with self.lock:
+            return [self._submit() for _ in range(count)]
+
+    def ensure(self, count: int = 1) -> List[Future]:
+        """Make sure at least count containers are being provisioned and return their futures"""
+        with self.lock:
+            missing = count - len(self.in_flight)
+            if missing <= 0:
+                self.coalesced += 1
+            for _ in range(missing):
+                self._submit()
+            return list(self.in_flight)
+
+    def _submit(self) -> Future:
+        future = self.executor.submit(self._provision_one)
+        self.in_flight.add(future)
+        self.started += 1
+        self.container_manager.snapshots.bump()
+        future.add_done_callback(self._done)
+        return future
+
+    def _provision_one(self) -> str:
+        start = time.time()
+        container_id = self.container_manager.acquire_new_container()
+        self.durations.append(time.time() - start)
+        return container_id
+
+    def _done(self, future: Future):
+        with self.lock:
+            self.in_flight.discard(future)
+            self.container_manager.snapshots.bump()
+            if future.cancelled() or future.exception() is None:
+                return
+            self.failed += 1
+            self.last_failure_at = time.time()
+        if self.container_manager.monitoring_active:
+            logger.error(f"Error provisioning container: {future.exception()}")
+
+    def shutdown(self):
+        """Stop starting containers; provisions already running finish in the background"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> dict:
+        """Get provisions in flight and how long recent ones took"""
+        durations = list(self.durations)
+        with self.lock:
+            return {
+                'in_flight': len(self.in_flight),
+                'started': self.started,
+                'failed': self.failed,
+                'coalesced': self.coalesced,
+                'avg_seconds': sum(durations) / len(durations) if durations else None
+            }
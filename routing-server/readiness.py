@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+from metrics import Histogram
+
+# Seconds before the first readiness probe of a new container
+READY_PROBE_INITIAL_DELAY = float(os.environ.get('READY_PROBE_INITIAL_DELAY', '0.02'))
+# Longest wait between readiness probes
+READY_PROBE_MAX_DELAY = float(os.environ.get('READY_PROBE_MAX_DELAY', '1'))
+# Seconds a new container has to become ready before it is given up on
+READY_PROBE_TIMEOUT = float(os.environ.get('READY_PROBE_TIMEOUT', '30'))
+# Upper bounds in seconds of the time-to-ready histogram buckets
+TIME_TO_READY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 30]
+
+
+class ContainerNotReadyError(Exception):
+    """Raised when a container exits or times out before becoming ready"""
+
+
+class ReadinessProbe:
+    """Waits for new containers to serve main-server's /ready endpoint
+
+    Probes start after tens of milliseconds and back off exponentially, so
+    a container that is ready quickly is put into service quickly without
+    hammering one that is slow to start. A Docker health_status: healthy
+    event for the container ends the wait early; the backend's view of the
+    container is only inspected when a probe can't connect, at most once
+    per READY_PROBE_MAX_DELAY, to notice a container that exited.
+    """
+
+    def __init__(self, initial_delay: float = READY_PROBE_INITIAL_DELAY,
+                 max_delay: float = READY_PROBE_MAX_DELAY, timeout: float = READY_PROBE_TIMEOUT):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.healthy: Dict[str, threading.Event] = {}
+        self.lock = threading.Lock()
+        self.time_to_ready = Histogram(TIME_TO_READY_BUCKETS)
+        self.probes = 0
+        self.failures = 0
+
+    def notify_healthy(self, container_id: str):
+        """Record that Docker reported a container healthy"""
+        with self.lock:
+            event = self.healthy.get(container_id)
+        if event is not None:
+            event.set()
+
+    def wait_until_ready(self, backend, container_id: str, started_at: Optional[float] = None) -> float:
+        """Block until a started container is ready and return the seconds it took"""
+        started_at = started_at or time.time()
+        deadline = started_at + self.timeout
+        healthy = threading.Event()
+        with self.lock:
+            self.healthy[container_id] = healthy
+        try:
+            delay = self.initial_delay
+            last_inspect = started_at
+            while True:
+                if healthy.wait(timeout=max(0.0, min(delay, deadline - time.time()))):
+                    break
+                if self._probe(backend, container_id, deadline):
+                    break
+                now = time.time()
+                if now >= deadline:
+                    self.failures += 1
+                    raise ContainerNotReadyError(f"Container {container_id} not ready after {self.timeout}s")
+                if now - last_inspect >= self.max_delay:
+                    last_inspect = now
+                    info = backend.inspect(container_id)
+                    status = info['status'] if info else 'removed'
+                    if status not in ('created', 'running'):
+                        self.failures += 1
+                        raise ContainerNotReadyError(f"Container {container_id} is {status}")
+                delay = min(delay * 2, self.max_delay)
+        finally:
+            with self.lock:
+                self.healthy.pop(container_id, None)
+
+        seconds = time.time() - started_at
+        self.time_to_ready.observe(seconds)
+        return seconds
+
+    def _probe(self, backend, container_id: str, deadline: float) -> bool:
+        self.probes += 1
+        address = backend.probe_address(container_id)
+        if not address:
+            return False
+        try:
+            response = requests.get(f"{address}/ready", timeout=max(0.1, min(1.0, deadline - time.time())))
+        except requests.exceptions.RequestException:
+            return False
+        # 404 means Flask is up but the image predates /ready
+        return response.status_code in (200, 404)
+
+    def concurrency(self, backend, container_id: str) -> int:
+        """Ask a ready container how many worker processes serve it; 1 if it doesn't say"""
+        address = backend.probe_address(container_id)
+        try:
+            response = requests.get(f"{address}/ready", timeout=2)
+            return max(1, int(response.json().get('workers', 1)))
+        except (requests.exceptions.RequestException, ValueError, AttributeError, TypeError):
+            return 1
+
+    def get_stats(self) -> dict:
+        """Get the time-to-ready histogram and probe counters"""
+        return {
+            'time_to_ready_seconds': self.time_to_ready.get_stats(),
+            'probes': self.probes,
+            'failures': self.failures
+        }
@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Optional
+
+# Maximum number of requests waiting for a container before new ones are rejected
+QUEUE_MAX_DEPTH = int(os.environ.get('QUEUE_MAX_DEPTH', '1000'))
+# Seconds a request may wait in the queue before it is given up on
+QUEUE_TIMEOUT = float(os.environ.get('QUEUE_TIMEOUT', '30'))
+# 'fifo' serves requests in arrival order, 'priority' serves higher priorities first
+QUEUE_ORDERING = os.environ.get('QUEUE_ORDERING', 'fifo')
+
+
+class QueueFullError(Exception):
+    """Raised when a request arrives while the queue is at its maximum depth"""
+
+
+class QueueTimeoutError(Exception):
+    """Raised when no container slot was granted before the queue timeout"""
+
+
+class Waiter:
+    """A request waiting in the queue for a container slot"""
+
+    def __init__(self, priority: int = 0, cost: float = 1.0):
+        self.priority = priority
+        self.cost = cost
+        self.container_id: Optional[str] = None
+        self.cancelled = False
+        self.enqueued_at = time.time()
+        self.granted_at: Optional[float] = None
+
+    @property
+    def queue_wait(self) -> float:
+        """Seconds spent in the queue"""
+        return (self.granted_at or time.time()) - self.enqueued_at
+
+    def grant(self, container_id: str):
+        """Hand the waiter a container with a slot already reserved for it"""
+        self.container_id = container_id
+        self.granted_at = time.time()
+        self._notify()
+
+    def _notify(self):
+        raise NotImplementedError
+
+
+class ThreadWaiter(Waiter):
+    """Waiter for a request served on its own thread"""
+
+    def __init__(self, priority: int = 0, cost: float = 1.0):
+        super().__init__(priority, cost)
+        self.event = threading.Event()
+
+    def _notify(self):
+        self.event.set()
+
+
+class AsyncWaiter(Waiter):
+    """Waiter for a request served by an asyncio event loop"""
+
+    def __init__(self, priority: int = 0, cost: float = 1.0):
+        super().__init__(priority, cost)
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+
+    def _notify(self):
+        self.loop.call_soon_threadsafe(self._set_result)
+
+    def _set_result(self):
+        if not self.future.done():
+            self.future.set_result(self.container_id)
+
+
+class RequestQueue:
+    """Bounded queue of /work requests waiting for container capacity
+
+    Waiters are granted a container (with its load already incremented) either
+    straight away when nobody is queued, or by dispatch(), which runs whenever capacity may have appeared: a request
+    arrived, a container slot was released or a new container registered.
+    """
+
+    def __init__(self, container_manager, max_depth: int = QUEUE_MAX_DEPTH,
+                 timeout: float = QUEUE_TIMEOUT, ordering: str = QUEUE_ORDERING):
+        self.container_manager = container_manager
+        self.max_depth = max_depth
+        self.timeout = timeout
+        self.ordering = ordering
+        self.heap = []
+        self.depth = 0
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.granted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+    def _push(self, waiter: Waiter):
+        """Add a waiter, rejecting it if the queue is full"""
+        if not self.depth:
+            # Nobody is waiting, so take a slot directly instead of queuing
+            container_id = self.container_manager.reserve_container(waiter.cost)
+            if container_id is not None:
+                waiter.grant(container_id)
+                with self.lock:
+                    self.granted += 1
+                    self.total_wait += waiter.queue_wait
+                return
+
+        with self.lock:
+            if self.depth >= self.max_depth:
+                self.rejected += 1
+                raise QueueFullError(f"Request queue is full ({self.max_depth} waiting)")
+            priority = -waiter.priority if self.ordering == 'priority' else 0
+            heapq.heappush(self.heap, (priority, next(self.sequence), waiter))
+            self.depth += 1
+        self.container_manager.snapshots.bump()
+        self.dispatch()
+
+    def _cancel(self, waiter: Waiter) -> bool:
+        """Withdraw a waiter that timed out; returns False if it was granted meanwhile"""
+        with self.lock:
+            if waiter.container_id is not None:
+                return False
+            # Lazily removed from the heap by dispatch()
+            waiter.cancelled = True
+            self.depth -= 1
+            self.timed_out += 1
+        self.container_manager.snapshots.bump()
+        return True
+
+    def _abandon(self, waiter: Waiter):
+        """Take back whatever a cancelled request held: its queue place, or the slot granted to it"""
+        with self.lock:
+            granted = waiter.container_id is not None
+            if not granted:
+                self.heap = [entry for entry in self.heap if entry[2] is not waiter]
+                heapq.heapify(self.heap)
+                self.depth -= 1
+        if granted:
+            self.container_manager.decrement_load(waiter.container_id, waiter.cost)
+        else:
+            self.container_manager.snapshots.bump()
+
+    def dispatch(self):
+        """Grant container slots to waiters in queue order while capacity lasts"""
+        with self.lock:
+            while self.heap:
+                waiter = self.heap[0][2]
+                if waiter.cancelled:
+                    heapq.heappop(self.heap)
+                    continue
+                container_id = self.container_manager.reserve_container(waiter.cost)
+                if container_id is None:
+                    # Ask for containers for everyone waiting; their registration dispatches again
+                    self.container_manager.request_capacity(self.depth)
+                    break
+                heapq.heappop(self.heap)
+                self.depth -= 1
+                self.container_manager.snapshots.bump()
+                waiter.grant(container_id)
+                self.granted += 1
+                self.total_wait += waiter.queue_wait
+
+    def acquire(self, priority: int = 0, cost: float = 1.0) -> ThreadWaiter:
+        """Block until a container slot for a job of the given cost is granted"""
+        waiter = ThreadWaiter(priority, cost)
+        self._push(waiter)
+        if not waiter.event.wait(timeout=self.timeout) and self._cancel(waiter):
+            raise QueueTimeoutError(f"No container became available within {self.timeout}s")
+        return waiter
+
+    async def acquire_async(self, priority: int = 0, cost: float = 1.0) -> AsyncWaiter:
+        """Wait on the event loop until a container slot for a job of the given cost is granted"""
+        waiter = AsyncWaiter(priority, cost)
+        self._push(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            if self._cancel(waiter):
+                raise QueueTimeoutError(f"No container became available within {self.timeout}s")
+        except asyncio.CancelledError:
+            # The client went away while queued; don't leave its place or its slot behind
+            self._abandon(waiter)
+            raise
+        return waiter
+
+    def get_stats(self) -> dict:
+        """Get queue depth and admission counters"""
+        with self.lock:
+            return {
+                'depth': self.depth,
+                'max_depth': self.max_depth,
+                'ordering': self.ordering,
+                'timeout': self.timeout,
+                'granted': self.granted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait_seconds': self.total_wait / self.granted if self.granted else 0.0
+            }
@@ -0,0 +1,60 @@
+import itertools
+import json
+import threading
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+
+class SnapshotCache:
+    """Serialized /status and /graph bodies cached per version of the manager's state
+
+    Everything that changes what those endpoints report calls bump(), and a
+    body is only rebuilt when the version moved since it was cached. The
+    version is a fresh value from an itertools.count on every bump, so
+    concurrent bumps never need a lock and a value is never current twice.
+    Figures that drift without a mutation, like smoothed rates, are
+    refreshed with the next one.
+    """
+
+    def __init__(self):
+        self.counter = itertools.count(1)
+        self.version = 0
+        # Tells ETags from a previous run of the router apart
+        self.epoch = uuid.uuid4().hex[:8]
+        self.entries: Dict[str, Tuple[int, str, bytes]] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self):
+        """Record that the state changed"""
+        self.version = next(self.counter)
+
+    def get(self, name: str, build: Callable[[], dict]) -> Tuple[str, bytes]:
+        """Get the ETag and JSON body of an endpoint, building it only if the state changed since it was cached"""
+        # Read the version before building so a change made meanwhile invalidates the body
+        version = self.version
+        entry = self.entries.get(name)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1], entry[2]
+
+        self.misses += 1
+        etag = f'"{self.epoch}-{name}-{version}"'
+        body = json.dumps(build()).encode()
+        with self.lock:
+            self.entries[name] = (version, etag, body)
+        return etag, body
+
+    def get_stats(self) -> dict:
+        """Get the current version and how often bodies were served from the cache"""
+        return {'version': self.version, 'hits': self.hits, 'misses': self.misses}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check whether an If-None-Match header covers an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
@@ -0,0 +1,161 @@
+import os
+import random
+import threading
+from typing import Dict, List
+
+# Load-balancing strategy used to pick containers, see STRATEGIES
+LB_STRATEGY = os.environ.get('LB_STRATEGY', 'least_connections')
+# Smoothing factor of the latency-aware strategy's moving average
+LATENCY_EWMA_ALPHA = float(os.environ.get('LATENCY_EWMA_ALPHA', '0.3'))
+
+
+class LoadBalancingStrategy:
+    """Decides which containers a request should try, in order of preference
+
+    order() receives a snapshot of container loads and returns the
+    containers below the limit, best first. The caller reserves a slot on
+    the first one that still has room, so the order is a preference, not
+    a reservation.
+    """
+
+    name = None
+
+    def order(self, loads: Dict[str, float], limit: float) -> List[str]:
+        raise NotImplementedError
+
+    def record_latency(self, container_id: str, seconds: float):
+        """Feed back how long a request took on a container"""
+
+    def set_weight(self, container_id: str, weight: float):
+        """Set a container's relative capacity"""
+
+    def forget(self, container_id: str):
+        """Drop any state kept for a removed container"""
+
+    def get_stats(self) -> dict:
+        """Get the strategy's name and per-container state"""
+        return {'name': self.name}
+
+    @staticmethod
+    def _available(loads: Dict[str, float], limit: float) -> List[str]:
+        return [container_id for container_id, load in loads.items() if load < limit]
+
+
+class LeastConnections(LoadBalancingStrategy):
+    """Prefer the container with the fewest requests in flight"""
+
+    name = 'least_connections'
+
+    def order(self, loads: Dict[str, float], limit: float) -> List[str]:
+        return sorted(self._available(loads, limit), key=lambda container_id: loads[container_id])
+
+
+class PowerOfTwoChoices(LoadBalancingStrategy):
+    """Sample two containers at random and prefer the less loaded one
+
+    Avoids every concurrent request herding onto the single least loaded
+    container while still steering away from busy ones.
+    """
+
+    name = 'power_of_two'
+
+    def order(self, loads: Dict[str, float], limit: float) -> List[str]:
+        available = self._available(loads, limit)
+        if len(available) <= 2:
+            return sorted(available, key=lambda container_id: loads[container_id])
+        choices = random.sample(available, 2)
+        choices.sort(key=lambda container_id: loads[container_id])
+        rest = sorted((container_id for container_id in available if container_id not in choices),
+                      key=lambda container_id: loads[container_id])
+        return choices + rest
+
+
+class WeightedRoundRobin(LoadBalancingStrategy):
+    """Smooth weighted round-robin over the containers with spare capacity"""
+
+    name = 'weighted_round_robin'
+
+    def __init__(self):
+        self.weights: Dict[str, float] = {}
+        self.current: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def set_weight(self, container_id: str, weight: float):
+        with self.lock:
+            self.weights[container_id] = weight
+
+    def forget(self, container_id: str):
+        with self.lock:
+            self.weights.pop(container_id, None)
+            self.current.pop(container_id, None)
+
+    def order(self, loads: Dict[str, float], limit: float) -> List[str]:
+        available = self._available(loads, limit)
+        if not available:
+            return []
+        with self.lock:
+            total = 0.0
+            for container_id in available:
+                weight = self.weights.get(container_id, 1.0)
+                self.current[container_id] = self.current.get(container_id, 0.0) + weight
+                total += weight
+            ordered = sorted(available, key=lambda container_id: self.current[container_id], reverse=True)
+            self.current[ordered[0]] -= total
+        return ordered
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {'name': self.name, 'weights': dict(self.weights)}
+
+
+class LatencyAware(LoadBalancingStrategy):
+    """Prefer the container with the lowest expected completion time
+
+    Keeps an exponentially weighted moving average of each container's
+    observed time_taken and scores containers by EWMA x (load + 1).
+    Containers without samples are scored with the fleet average so new
+    containers still get traffic.
+    """
+
+    name = 'latency_aware'
+
+    def __init__(self, alpha: float = LATENCY_EWMA_ALPHA):
+        self.alpha = alpha
+        self.ewma: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def record_latency(self, container_id: str, seconds: float):
+        with self.lock:
+            previous = self.ewma.get(container_id)
+            if previous is None:
+                self.ewma[container_id] = seconds
+            else:
+                self.ewma[container_id] = self.alpha * seconds + (1 - self.alpha) * previous
+
+    def forget(self, container_id: str):
+        with self.lock:
+            self.ewma.pop(container_id, None)
+
+    def order(self, loads: Dict[str, float], limit: float) -> List[str]:
+        available = self._available(loads, limit)
+        with self.lock:
+            ewma = dict(self.ewma)
+        default = sum(ewma.values()) / len(ewma) if ewma else 1.0
+        return sorted(available, key=lambda container_id: ewma.get(container_id, default) * (loads[container_id] + 1))
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {'name': self.name, 'ewma_seconds': dict(self.ewma)}
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (LeastConnections, PowerOfTwoChoices, WeightedRoundRobin, LatencyAware)
+}
+
+
+def create_strategy(name: str = LB_STRATEGY) -> LoadBalancingStrategy:
+    """Create a load-balancing strategy by name"""
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown load-balancing strategy {name!r}, choose one of {', '.join(STRATEGIES)}")
+    return STRATEGIES[name]()
@@ -0,0 +1,127 @@
+import os
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+# Raw 1-second samples kept per series
+TIMESERIES_RAW_CAPACITY = int(os.environ.get('TIMESERIES_RAW_CAPACITY', '300'))
+# Rollup resolutions in seconds and how many buckets of each are kept per series
+TIMESERIES_ROLLUPS = {10: 360, 60: 1440}
+
+
+class RingBuffer:
+    """Fixed-capacity columns of doubles that overwrite their oldest row
+
+    Each column is an array('d') allocated up front, so appending a row
+    writes into existing slots without allocating.
+    """
+
+    def __init__(self, capacity: int, columns: List[str]):
+        self.capacity = capacity
+        self.columns = {name: array('d', bytes(8 * capacity)) for name in columns}
+        self.next = 0
+        self.size = 0
+
+    def append(self, *values: float):
+        for column, value in zip(self.columns.values(), values):
+            column[self.next] = value
+        self.next = (self.next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def rows_since(self, since: float) -> Dict[str, list]:
+        """Get every column in time order, keeping rows whose first column is at or after since"""
+        start = (self.next - self.size) % self.capacity
+        order = [(start + i) % self.capacity for i in range(self.size)]
+        first = next(iter(self.columns.values()))
+        order = [index for index in order if first[index] >= since]
+        return {name: [column[index] for index in order] for name, column in self.columns.items()}
+
+
+class Rollup:
+    """Downsamples a series into buckets of a fixed number of seconds, keeping each bucket's mean and max"""
+
+    def __init__(self, resolution: int, capacity: int):
+        self.resolution = resolution
+        self.buffer = RingBuffer(capacity, ['timestamps', 'values', 'max'])
+        self.bucket_start = None
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, timestamp: float, value: float):
+        bucket_start = timestamp - timestamp % self.resolution
+        if self.bucket_start is not None and bucket_start != self.bucket_start:
+            self.flush()
+        if self.count == 0:
+            self.bucket_start = bucket_start
+            self.max = value
+        self.total += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def flush(self):
+        """Close the current bucket"""
+        if self.count:
+            self.buffer.append(self.bucket_start, self.total / self.count, self.max)
+        self.total = 0.0
+        self.count = 0
+
+
+class TimeSeries:
+    """One series: raw samples plus a rollup per resolution"""
+
+    def __init__(self, raw_capacity: int = TIMESERIES_RAW_CAPACITY):
+        self.raw = RingBuffer(raw_capacity, ['timestamps', 'values'])
+        self.rollups = {resolution: Rollup(resolution, capacity) for resolution, capacity in TIMESERIES_ROLLUPS.items()}
+
+    def append(self, timestamp: float, value: float):
+        self.raw.append(timestamp, value)
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, value)
+
+
+class TimeSeriesStore:
+    """Bounded in-memory history of named series
+
+    Series are sampled about once a second. The last TIMESERIES_RAW_CAPACITY
+    samples are kept as they are, and 10s and 1min rollups of the mean and
+    max cover the longer history. Memory per series is fixed when it is
+    created.
+    """
+
+    resolutions = [1] + sorted(TIMESERIES_ROLLUPS)
+
+    def __init__(self):
+        self.series: Dict[str, TimeSeries] = {}
+        self.lock = threading.Lock()
+
+    def record(self, key: str, timestamp: float, value: float):
+        """Append a sample to a series, creating it on first use"""
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = TimeSeries()
+            series.append(timestamp, value)
+
+    def drop(self, key: str):
+        """Forget a series"""
+        with self.lock:
+            self.series.pop(key, None)
+
+    def keys(self) -> List[str]:
+        with self.lock:
+            return sorted(self.series)
+
+    def query(self, key: str, resolution: int = 1, since: float = 0.0) -> Optional[dict]:
+        """Get a series' samples at a resolution as columns, or None if there is no such series"""
+        if resolution not in self.resolutions:
+            raise ValueError(f"Unknown resolution {resolution}, choose one of {', '.join(map(str, self.resolutions))}")
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                return None
+            if resolution == 1:
+                columns = series.raw.rows_since(since)
+            else:
+                columns = series.rollups[resolution].buffer.rows_since(since)
+        return {'series': key, 'resolution': resolution, **columns}
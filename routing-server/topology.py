@@ -0,0 +1,77 @@
+import os
+import threading
+from typing import Dict, List
+
+# Weight of the latest sample in each container's smoothed request rate
+REQUEST_RATE_ALPHA = float(os.environ.get('REQUEST_RATE_ALPHA', '0.5'))
+# ID of the routing server's node in /graph
+ROUTER_NODE_ID = 'router'
+
+
+class Topology:
+    """Router → container edges weighted by each container's request rate
+
+    Rates are smoothed from the number of requests each container has
+    completed, sampled about once a second. Only edges whose rounded rate
+    changed are replaced, and the edge list is cached until one does, so
+    reading it costs nothing between samples.
+    """
+
+    def __init__(self, alpha: float = REQUEST_RATE_ALPHA):
+        self.alpha = alpha
+        self.rates: Dict[str, float] = {}
+        self.completed: Dict[str, int] = {}
+        self.edges: Dict[str, dict] = {}
+        self.edge_list: List[dict] = []
+        self.last_update = None
+        self.lock = threading.Lock()
+
+    def update(self, completed: Dict[str, int], now: float) -> bool:
+        """Fold in each container's completed request count as of now; returns whether any edge changed"""
+        with self.lock:
+            elapsed = now - self.last_update if self.last_update is not None else None
+            self.last_update = now
+            changed = False
+            for container_id, count in completed.items():
+                previous = self.completed.get(container_id)
+                self.completed[container_id] = count
+                if previous is None or not elapsed:
+                    rate = self.rates.get(container_id, 0.0)
+                else:
+                    sample = max(0, count - previous) / elapsed
+                    rate = self.alpha * sample + (1 - self.alpha) * self.rates.get(container_id, 0.0)
+                    # Let an idle container's rate reach zero instead of decaying forever
+                    rate = rate if rate >= 0.05 else 0.0
+                self.rates[container_id] = rate
+
+                weight = round(rate, 1)
+                edge = self.edges.get(container_id)
+                if edge is None or edge['weight'] != weight:
+                    self.edges[container_id] = {'source': ROUTER_NODE_ID, 'target': container_id, 'weight': weight}
+                    changed = True
+
+            for container_id in [container_id for container_id in self.edges if container_id not in completed]:
+                self._drop(container_id)
+                changed = True
+            if changed:
+                self.edge_list = list(self.edges.values())
+            return changed
+
+    def forget(self, container_id: str):
+        """Drop a removed container's edge"""
+        with self.lock:
+            if self._drop(container_id):
+                self.edge_list = list(self.edges.values())
+
+    def _drop(self, container_id: str) -> bool:
+        self.rates.pop(container_id, None)
+        self.completed.pop(container_id, None)
+        return self.edges.pop(container_id, None) is not None
+
+    def rate(self, container_id: str) -> float:
+        """Get a container's smoothed request rate in requests per second"""
+        return round(self.rates.get(container_id, 0.0), 1)
+
+    def get_edges(self) -> List[dict]:
+        """Get the cached edges; the list is replaced, never mutated, so callers can serialize it as is"""
+        return self.edge_list
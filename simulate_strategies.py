@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Local simulation harness for the routing server's load-balancing strategies.
+
+Generates one synthetic /work workload (Poisson arrivals, widely varying
+intensity) and replays it against a simulated fleet of containers once per
+strategy, using the same strategy classes as the router. Containers run at
+different speeds and slow down as they take on concurrent jobs, roughly like
+main-server containers sharing a CPU. Prints the latency distribution each
+strategy achieves; no Docker or running server is needed. With --cost-aware,
+container load is weighted by each job's learned cost, as in the router.
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing-server'))
+
+from cost_model import CostModel  # noqa: E402
+from strategies import STRATEGIES, create_strategy  # noqa: E402
+
+# Relative slowness of each simulated container
+CONTAINER_SPEEDS = [1.0, 1.0, 1.0, 1.3, 1.6, 2.0]
+# Extra service time per job already running on a container
+CONTENTION = 0.2
+# Load per container in cost units, as MAX_LOAD_PER_CONTAINER
+LIMIT = 3
+# Share of jobs per intensity band: mostly small jobs with a heavy tail
+INTENSITY_BANDS = [((1, 2), 0.7), ((3, 6), 0.2), ((7, 10), 0.1)]
+
+
+def generate_workload(requests, rate, seed):
+    """Return a list of (arrival_time, intensity) pairs"""
+    rng = random.Random(seed)
+    bands = [band for band, _ in INTENSITY_BANDS]
+    weights = [weight for _, weight in INTENSITY_BANDS]
+    now = 0.0
+    workload = []
+    for _ in range(requests):
+        now += rng.expovariate(rate)
+        low, high = rng.choices(bands, weights)[0]
+        workload.append((now, rng.randint(low, high)))
+    return workload
+
+
+def service_time(intensity, speed, concurrent):
+    """Approximate /heavy time: factorials plus intensity * 0.5s sleep"""
+    return (0.55 * intensity) * speed * (1 + CONTENTION * concurrent)
+
+
+def simulate(strategy_name, workload, seed, cost_aware=False):
+    """Replay a workload through one strategy and return per-request latencies"""
+    random.seed(seed)
+    strategy = create_strategy(strategy_name)
+    cost_model = CostModel()
+    containers = [f"container-{i}" for i in range(len(CONTAINER_SPEEDS))]
+    speeds = dict(zip(containers, CONTAINER_SPEEDS))
+    for container_id in containers:
+        strategy.set_weight(container_id, 1 / speeds[container_id])
+    # Load in cost units (every job costs 1 unless cost_aware) and running jobs
+    loads = {container_id: 0.0 for container_id in containers}
+    counts = {container_id: 0 for container_id in containers}
+
+    # Events are (time, order, kind, payload); order keeps ties deterministic
+    events = []
+    order = 0
+    for arrival, intensity in workload:
+        events.append((arrival, order, 'arrive', (arrival, intensity)))
+        order += 1
+    heapq.heapify(events)
+    queue = []
+    latencies = []
+
+    def try_start(now, job):
+        """Start a job on the first candidate it fits on, as reserve_container does"""
+        nonlocal order
+        arrival, intensity = job
+        cost = cost_model.cost(intensity) if cost_aware else 1.0
+        for container_id in strategy.order(loads, LIMIT):
+            duration = service_time(intensity, speeds[container_id], counts[container_id])
+            loads[container_id] += cost
+            counts[container_id] += 1
+            heapq.heappush(events, (now + duration, order, 'finish', (container_id, job, cost, duration)))
+            order += 1
+            return True
+        return False
+
+    while events:
+        now, _, kind, payload = heapq.heappop(events)
+        if kind == 'arrive':
+            queue.append(payload)
+        else:
+            container_id, (arrival, intensity), cost, duration = payload
+            counts[container_id] -= 1
+            loads[container_id] = loads[container_id] - cost if counts[container_id] else 0.0
+            cost_model.observe(intensity, duration)
+            strategy.record_latency(container_id, duration)
+            latencies.append(now - arrival)
+        # Dispatch queued jobs in FIFO order while the head of the queue fits somewhere
+        while queue and try_start(now, queue[0]):
+            queue.pop(0)
+
+    return latencies
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of values"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000, help='requests in the workload')
+    parser.add_argument('--rate', type=float, default=5.0, help='mean arrivals per second')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the workload and strategies')
+    parser.add_argument('--strategies', nargs='*', default=list(STRATEGIES), help='strategies to compare')
+    parser.add_argument('--cost-aware', action='store_true', help='weight container load by learned job cost')
+    args = parser.parse_args()
+
+    workload = generate_workload(args.requests, args.rate, args.seed)
+
+    print("=" * 70)
+    print("LOAD-BALANCING STRATEGY SIMULATION")
+    print(f"{args.requests} requests at {args.rate}/s on {len(CONTAINER_SPEEDS)} containers "
+          f"(limit {LIMIT} {'cost units' if args.cost_aware else 'jobs'} each)")
+    print("=" * 70)
+    print(f"{'strategy':<24}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for strategy_name in args.strategies:
+        latencies = simulate(strategy_name, workload, args.seed, args.cost_aware)
+        print(f"{strategy_name:<24}"
+              f"{sum(latencies) / len(latencies):>8.2f}s"
+              f"{percentile(latencies, 50):>8.2f}s"
+              f"{percentile(latencies, 95):>8.2f}s"
+              f"{percentile(latencies, 99):>8.2f}s"
+              f"{max(latencies):>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
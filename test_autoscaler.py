@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Stability check for the autoscaler's replica target.
+
+Replays simulate_strategies.py's mixed workload at a constant arrival rate
+through Autoscaler.tick with a fake container manager and clock, and checks
+that the recommended fleet size holds steady at what the workload's true
+mean service time calls for. No Docker or running server is needed.
+"""
+
+import os
+import random
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing-server'))
+
+from autoscaler import Autoscaler  # noqa: E402
+from simulate_strategies import generate_workload, service_time  # noqa: E402
+
+RATE = 5
+TICKS = 600
+# Ticks the arrival rate average and the service time window need to settle
+WARMUP = 60
+SLOTS_PER_REPLICA = 3
+
+
+class FakeQueue:
+    def __init__(self):
+        self.granted = 0
+
+    def get_stats(self):
+        return {'granted': self.granted, 'rejected': 0, 'timed_out': 0, 'depth': 0}
+
+
+class FakeManager:
+    """Just enough of ContainerManager for Autoscaler.tick"""
+
+    def __init__(self):
+        self.request_queue = FakeQueue()
+        self.serving = 1
+        self.provisioning = 0
+
+    def scale_up(self, count):
+        self.serving += count
+
+    def scale_down_one(self):
+        self.serving -= 1
+        return True
+
+
+def main():
+    print("=" * 50)
+    print("AUTOSCALER STABILITY CHECK")
+    print("=" * 50)
+    print()
+
+    workload = generate_workload(RATE * TICKS, RATE, seed=1)
+    rng = random.Random(1)
+    times_taken = [service_time(intensity, 1.0, rng.randint(0, 2)) for _, intensity in workload]
+    true_mean = sum(times_taken) / len(times_taken)
+
+    manager = FakeManager()
+    autoscaler = Autoscaler(manager, SLOTS_PER_REPLICA)
+    now = 1000.0
+    targets = []
+    with mock.patch('autoscaler.time.time', lambda: now):
+        for tick in range(TICKS):
+            now += 1.0
+            manager.request_queue.granted += RATE
+            for seconds in times_taken[tick * RATE:(tick + 1) * RATE]:
+                autoscaler.record_service_time(seconds)
+            autoscaler.tick()
+            if tick >= WARMUP:
+                targets.append(autoscaler.desired)
+
+    expected = autoscaler.desired_replicas(RATE, true_mean, autoscaler._service_p95(), 0)
+    print(f"  Arrival rate:      {RATE} req/s, true mean service time {true_mean:.2f}s")
+    print(f"  Expected target:   {expected} replicas")
+    print(f"  Targets after {WARMUP}s: {min(targets)}-{max(targets)} replicas")
+    print(f"  Final fleet:       {manager.serving} replicas")
+    print()
+
+    ok = True
+    if max(targets) - min(targets) > 1:
+        ok = False
+        print(f"✗ Target swung between {min(targets)} and {max(targets)} replicas at a constant rate")
+    if any(abs(target - expected) > 1 for target in targets):
+        ok = False
+        print(f"✗ Target strayed more than one replica from {expected}")
+    if manager.serving > expected + 1:
+        ok = False
+        print(f"✗ Fleet grew to {manager.serving} replicas")
+    if ok:
+        print("✓ Target held steady at a constant arrival rate")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test for the routing server's Docker event handling.
+
+Drives a ContainerManager with a fake Docker client that emits scripted
+container events, and checks that dead and unhealthy containers leave the
+registry as soon as their event arrives, without waiting for the monitor
+loop to poll Docker. Needs no Docker daemon.
+"""
+
+import os
+import queue
+import sys
+import time
+from datetime import datetime
+
+# Keep the manager from starting warm containers and from polling on its own
+os.environ.setdefault('WARM_POOL_SIZE', '0')
+os.environ.setdefault('RECONCILE_INTERVAL', '3600')
+os.environ.setdefault('EVENTS_RECONNECT_DELAY', '0.1')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing-server'))
+
+import docker  # noqa: E402
+from backends import DockerBackend  # noqa: E402
+from container_manager import ContainerManager  # noqa: E402
+
+EVENT_TIMEOUT = 2.0
+
+
+class FakeContainer:
+    def __init__(self, container_id, ip_address):
+        self.id = container_id
+        self.status = 'running'
+        self.attrs = {
+            'Id': container_id,
+            'State': 'running',
+            'NetworkSettings': {'Networks': {'bridge': {'IPAddress': ip_address}}}
+        }
+
+    def stop(self, timeout=None):
+        self.status = 'exited'
+
+    def remove(self):
+        pass
+
+
+class FakeContainers:
+    def __init__(self):
+        self.by_id = {}
+        self.list_calls = 0
+
+    def get(self, container_id):
+        if container_id not in self.by_id:
+            raise docker.errors.NotFound(f"No such container: {container_id}")
+        return self.by_id[container_id]
+
+    def list(self, sparse=False, filters=None):
+        self.list_calls += 1
+        return [container for container in self.by_id.values() if container.status == 'running']
+
+
+class FakeEventStream:
+    """Blocking iterator of scripted events, like docker's CancellableStream"""
+
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def __iter__(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            yield event
+
+    def close(self):
+        self.events.put(None)
+
+
+class FakeDockerClient:
+    def __init__(self):
+        self.containers = FakeContainers()
+        self.streams = []
+        self.subscriptions = []
+        self.clock = int(time.time())
+
+    def events(self, decode=False, filters=None, since=None):
+        self.subscriptions.append({'filters': filters, 'since': since})
+        stream = FakeEventStream()
+        self.streams.append(stream)
+        return stream
+
+    def emit(self, container_id, action):
+        self.clock += 1
+        self.streams[-1].events.put({
+            'Type': 'container',
+            'Action': action,
+            'id': container_id,
+            'Actor': {'ID': container_id, 'Attributes': {}},
+            'time': self.clock
+        })
+
+    def break_stream(self):
+        self.streams[-1].close()
+
+
+def wait_for(condition, timeout=EVENT_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def main():
+    print("=" * 50)
+    print("DOCKER EVENTS TEST")
+    print("=" * 50)
+    print()
+
+    client = FakeDockerClient()
+    manager = ContainerManager(backend=DockerBackend(client))
+    failures = []
+
+    def check(ok, message):
+        print(f"{'✓' if ok else '✗'} {message}")
+        if not ok:
+            failures.append(message)
+
+    def add_container(index):
+        container_id = f"container-{index}"
+        container = FakeContainer(container_id, f"172.18.0.{index + 10}")
+        client.containers.by_id[container_id] = container
+        container_info = {
+            'name': f"main-server-{index}",
+            'port': manager._find_available_port(),
+            'created_at': datetime.now().isoformat()
+        }
+        manager._register_container(container_id, container_info)
+        return container_id
+
+    try:
+        check(wait_for(lambda: manager.backend.event_watcher.connected), "Event watcher subscribed to the event stream")
+        filters = client.subscriptions[0]['filters']
+        check(filters.get('type') == 'container' and 'die' in filters.get('event', []),
+              "Subscribed to container lifecycle events only")
+
+        container_ids = [add_container(i) for i in range(6)]
+        list_calls = client.containers.list_calls
+
+        for container_id, action in zip(container_ids, ['die', 'stop', 'oom', 'health_status: unhealthy']):
+            start = time.time()
+            client.containers.by_id[container_id].status = 'exited'
+            client.emit(container_id, action)
+            removed = wait_for(lambda: container_id not in manager.containers)
+            check(removed, f"'{action}' removed {container_id} in {(time.time() - start) * 1000:.0f}ms")
+
+        healthy_id = container_ids[4]
+        client.emit(healthy_id, 'health_status: healthy')
+        client.emit('not-managed', 'die')
+        time.sleep(0.2)
+        check(healthy_id in manager.containers, "'health_status: healthy' kept the container")
+        check(client.containers.list_calls == list_calls, "Events were handled without polling Docker")
+
+        # Warm containers are discarded on their events too
+        warm_container = FakeContainer('warm-0', '172.18.0.99')
+        client.containers.by_id['warm-0'] = warm_container
+        with manager.warm_pool_condition:
+            manager.warm_pool.append(('warm-0', {'name': 'main-server-warm', 'port': manager._find_available_port()}))
+        client.emit('warm-0', 'die')
+        check(wait_for(lambda: not manager.warm_pool), "'die' discarded a warm container")
+
+        # After the stream breaks, the watcher resubscribes from the last event it saw
+        last_event_time = manager.backend.event_watcher.last_event_time
+        client.break_stream()
+        check(wait_for(lambda: len(client.subscriptions) == 2 and manager.backend.event_watcher.connected),
+              "Watcher resubscribed after the stream broke")
+        check(client.subscriptions[-1]['since'] == last_event_time, "Resubscribed from the last event seen")
+        client.emit(healthy_id, 'die')
+        check(wait_for(lambda: healthy_id not in manager.containers), "Events after resubscribing are handled")
+
+        # Reconciliation catches a container that died without an event
+        silent_id = container_ids[5]
+        client.containers.by_id[silent_id].status = 'exited'
+        manager._reconcile_containers()
+        check(silent_id not in manager.containers, "Reconciliation removed a container that died silently")
+        check(not manager.load_tracker.snapshot() and not manager.container_urls,
+              "Load and endpoint registry were cleaned up")
+    finally:
+        manager.shutdown()
+
+    print()
+    if failures:
+        print(f"✗ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("✓ Container events update the registry immediately")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Stress test for the routing server's load accounting.
+
+Hammers a LoadTracker from 100 threads with jobs of mixed cost while a
+monitor thread keeps retiring idle containers and bringing them back, the
+way scale-down and scale-up do, and checks that the counters never drift.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing-server'))
+
+from load_tracker import LoadTracker  # noqa: E402
+
+THREADS = 100
+ITERATIONS = 2000
+CONTAINERS = [f"container-{i}" for i in range(8)]
+LIMIT = 3
+COSTS = [0.5, 1.0, 2.5]
+
+
+def main():
+    print("=" * 50)
+    print("LOAD ACCOUNTING STRESS TEST")
+    print("=" * 50)
+    print()
+
+    tracker = LoadTracker()
+    for container_id in CONTAINERS:
+        tracker.add(container_id)
+
+    violations = []
+    counts_lock = threading.Lock()
+    counts = {'reserved': 0, 'released': 0, 'rejected': 0, 'retired': 0}
+    running = threading.Event()
+    running.set()
+
+    def worker():
+        reserved = released = rejected = 0
+        for _ in range(ITERATIONS):
+            container_id = random.choice(CONTAINERS)
+            cost = random.choice(COSTS)
+            if not tracker.try_reserve(container_id, LIMIT, cost):
+                rejected += 1
+                continue
+            reserved += 1
+            # A container only accepts work below LIMIT, so one job can overshoot it by at most its cost
+            load = tracker.get(container_id)
+            if not cost <= load < LIMIT + max(COSTS):
+                violations.append(f"{container_id} had load {load} while a slot was held")
+            time.sleep(0)  # let other threads interleave while the slot is held
+            tracker.release(container_id, cost)
+            released += 1
+        with counts_lock:
+            counts['reserved'] += reserved
+            counts['released'] += released
+            counts['rejected'] += rejected
+
+    def monitor():
+        while running.is_set():
+            container_id = random.choice(CONTAINERS)
+            if tracker.retire_if_idle(container_id):
+                counts['retired'] += 1
+                tracker.add(container_id)
+            time.sleep(0.001)
+
+    monitor_thread = threading.Thread(target=monitor)
+    monitor_thread.start()
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    running.clear()
+    monitor_thread.join()
+    elapsed = time.time() - start
+
+    final_loads = tracker.snapshot()
+    print(f"  Reservations: {counts['reserved']} ({counts['rejected']} rejected at the limit)")
+    print(f"  Releases:     {counts['released']}")
+    print(f"  Idle retires: {counts['retired']}")
+    print(f"  Elapsed:      {elapsed:.2f}s")
+    print()
+
+    ok = True
+    if violations:
+        ok = False
+        print(f"✗ {len(violations)} load limit violations, e.g. {violations[0]}")
+    if counts['reserved'] != counts['released']:
+        ok = False
+        print("✗ Reservations and releases don't match")
+    if any(final_loads.values()) or any(tracker.count_snapshot().values()):
+        ok = False
+        print(f"✗ Counters drifted: {final_loads}")
+    if ok:
+        print("✓ Counters never exceeded the limit and settled back to zero")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
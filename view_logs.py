@@ -8,12 +8,20 @@ import time
 import json
 from datetime import datetime
 
+# Last status received and its ETag, reused while the routing server answers 304 Not Modified
+last_status = {'etag': None, 'data': None}
+
 def get_logs():
     """Get logs from the routing server"""
     try:
-        response = requests.get('http://localhost:8000/status')
+        headers = {'If-None-Match': last_status['etag']} if last_status['etag'] else {}
+        response = requests.get('http://localhost:8000/status', headers=headers)
+        if response.status_code == 304:
+            return last_status['data']
         if response.status_code == 200:
-            return response.json()
+            last_status['etag'] = response.headers.get('ETag')
+            last_status['data'] = response.json()
+            return last_status['data']
         return None
     except Exception as e:
         print(f"Error getting logs: {e}")